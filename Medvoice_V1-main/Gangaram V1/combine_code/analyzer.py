@@ -0,0 +1,291 @@
+import copy
+import threading
+import time
+import torch
+from chunking import chunk_text
+from cpu_inference import load_cpu_model, configure_threads, model_size_bytes
+import metrics
+from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
+
+SUMMARY_MARKER = "Analysis Summary:"
+
+GENERATED_TOKENS = metrics.Counter("medvoice_llm_generated_tokens_total", "Tokens produced by generate()")
+
+# Fixed instruction header shared by every prompt. Its key/value cache is
+# computed once per model and reused, so only the conversation is prefilled.
+PROMPT_PREFIX = """Analyze the following doctor-patient conversation and provide a structured summary:
+        1. Identify the patient's main concerns or symptoms
+        2. Note any diagnoses or assessments made by the doctor
+        3. List any recommended treatments or next steps
+        4. Highlight important follow-up information
+        
+        Conversation:
+        """
+
+
+# ========== GPT-2 Summarizer ==========
+class ConversationAnalyzer:
+    def __init__(self, model_name="gpt2", inference_mode="fp32", num_threads=None, cache_dir=None):
+        self.model_name = model_name
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if self.device == "cpu":
+            # inference_mode is "fp32", "int8" (dynamic quantization) or "bf16";
+            # the mode actually used is kept, since bf16 falls back on older CPUs.
+            configure_threads(num_threads)
+            self.model, self.inference_mode = load_cpu_model(model_name, inference_mode, cache_dir)
+        else:
+            self.model = AutoModelForCausalLM.from_pretrained(model_name).to(self.device)
+            self.inference_mode = "fp32"
+
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        # Decoder-only models must be padded on the left so every prompt in a
+        # batch ends right where generation starts.
+        self.tokenizer.padding_side = "left"
+
+        self._prefix_cache = None
+        self._prefix_lock = threading.Lock()
+
+    def memory_footprint(self):
+        """Approximate size of the loaded weights in bytes"""
+        return model_size_bytes(self.model)
+
+    def build_prompt(self, conversation_text):
+        return PROMPT_PREFIX + self.build_prompt_tail(conversation_text)
+
+    def build_prompt_tail(self, conversation_text):
+        return f"""{conversation_text.strip()}
+        
+        {SUMMARY_MARKER}
+        """
+
+    def get_prefix_cache(self):
+        """Return (prefix_ids, past_key_values) for PROMPT_PREFIX, computing them on first use"""
+        # The cache is tied to the exact model object and device, so swapping
+        # the model (or moving it) rebuilds it instead of reusing stale keys.
+        cache_key = (id(self.model), self.device, PROMPT_PREFIX)
+        with self._prefix_lock:
+            if self._prefix_cache is None or self._prefix_cache[0] != cache_key:
+                prefix_ids = self.tokenizer(PROMPT_PREFIX, return_tensors="pt")["input_ids"].to(self.device)
+                with torch.no_grad():
+                    past = self.model(prefix_ids, use_cache=True).past_key_values
+                self._prefix_cache = (cache_key, prefix_ids, past)
+            return self._prefix_cache[1], self._prefix_cache[2]
+
+    def copy_prefix_past(self, past, batch_size):
+        """generate() appends to the cache in place, so every call gets its own copy"""
+        past = copy.deepcopy(past)
+        if batch_size == 1:
+            return past
+        if hasattr(past, "batch_repeat_interleave"):
+            past.batch_repeat_interleave(batch_size)
+            return past
+        return tuple(tuple(t.repeat_interleave(batch_size, dim=0) for t in layer) for layer in past)
+
+    def extract_summary(self, full_output):
+        summary_start = full_output.find(SUMMARY_MARKER) + len(SUMMARY_MARKER)
+        summary = full_output[summary_start:].strip()
+
+        if "Conversation:" in summary:
+            summary = summary.split("Conversation:")[0].strip()
+
+        return summary
+
+    def context_window(self):
+        """Maximum number of positions the model can attend to"""
+        config = self.model.config
+        for attr in ("n_positions", "max_position_embeddings"):
+            if getattr(config, attr, None):
+                return getattr(config, attr)
+        return self.tokenizer.model_max_length
+
+    def count_tokens(self, text):
+        return len(self.tokenizer.encode(text, add_special_tokens=False, verbose=False))
+
+    def conversation_budget(self, max_length):
+        """How many conversation tokens fit next to the prompt and max_length new tokens"""
+        overhead = self.count_tokens(PROMPT_PREFIX) + self.count_tokens(self.build_prompt_tail(""))
+        budget = self.context_window() - overhead - max_length
+        if budget <= 0:
+            raise ValueError(f"max_length={max_length} leaves no room for the conversation in a "
+                             f"{self.context_window()}-token context")
+        return budget
+
+    def condense(self, conversation_text, max_length=200, temperature=0.7, map_batch_size=4, max_rounds=3):
+        """Map-reduce a transcript until it fits in one prompt.
+
+        Transcripts longer than the context are split on speaker turns, the
+        chunks are summarized map_batch_size at a time, and the partial
+        summaries are joined and condensed again if they still do not fit.
+        """
+        budget = self.conversation_budget(max_length)
+        text = conversation_text.strip()
+
+        for _ in range(max_rounds):
+            if self.count_tokens(text) <= budget:
+                return text
+            chunks = chunk_text(text, self.count_tokens, budget)
+            partials = []
+            for start in range(0, len(chunks), map_batch_size):
+                batch = chunks[start:start + map_batch_size]
+                partials.extend(self.analyze_batch(batch, max_length=max_length, temperature=temperature))
+            text = "\n".join(f"Part {i + 1}: {partial}" for i, partial in enumerate(partials))
+
+        # Still too long after max_rounds: keep the leading budget tokens.
+        ids = self.tokenizer.encode(text, add_special_tokens=False, verbose=False)[:budget]
+        return self.tokenizer.decode(ids)
+
+    def analyze_conversation(self, conversation_text, max_length=200, temperature=0.7):
+        return self.analyze_documents([conversation_text], max_length=max_length, temperature=temperature)[0]
+
+    def analyze_documents(self, conversation_texts, max_length=200, temperature=0.7):
+        """Like analyze_batch(), but transcripts of any length are condensed to fit the context first"""
+        condensed = [self.condense(text, max_length=max_length, temperature=temperature) for text in conversation_texts]
+        return self.analyze_batch(condensed, max_length=max_length, temperature=temperature)
+
+    def prepare_inputs(self, conversation_texts):
+        """Return (input_ids, attention_mask, past_key_values) for a batch of conversations"""
+        prefix_ids, prefix_past = self.get_prefix_cache()
+        batch_size = len(conversation_texts)
+
+        # Layout per row is [prefix][padding][conversation tail]: the prefix
+        # comes from the shared cache and padding is masked out, so only the
+        # tails are prefilled.
+        tails = [self.build_prompt_tail(text) for text in conversation_texts]
+        tail_inputs = self.tokenizer(tails, return_tensors="pt", padding=True, add_special_tokens=False).to(self.device)
+        input_ids = torch.cat([prefix_ids.expand(batch_size, -1), tail_inputs["input_ids"]], dim=1)
+        attention_mask = torch.cat([torch.ones_like(prefix_ids).expand(batch_size, -1), tail_inputs["attention_mask"]], dim=1)
+        return input_ids, attention_mask, self.copy_prefix_past(prefix_past, batch_size)
+
+    def analyze_batch(self, conversation_texts, max_length=200, temperature=0.7):
+        """Summarize several conversations with a single padded generate() call"""
+        input_ids, attention_mask, past = self.prepare_inputs(conversation_texts)
+        timer = _TokenTimer()
+
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids,
+                attention_mask=attention_mask,
+                past_key_values=past,
+                max_new_tokens=max_length,
+                temperature=temperature,
+                do_sample=True,
+                pad_token_id=self.tokenizer.eos_token_id,
+                no_repeat_ngram_size=2,
+                stopping_criteria=StoppingCriteriaList([timer])
+            )
+        timer.finish(output.shape[0])
+
+        full_outputs = self.tokenizer.batch_decode(output, skip_special_tokens=True)
+        return [self.extract_summary(full_output) for full_output in full_outputs]
+
+    def stream_conversation(self, conversation_text, max_length=200, temperature=0.7):
+        """Yield summary text pieces as generate() produces them"""
+        conversation_text = self.condense(conversation_text, max_length=max_length, temperature=temperature)
+        input_ids, attention_mask, past = self.prepare_inputs([conversation_text])
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop_event = threading.Event()
+        timer = _TokenTimer()
+        errors = []
+
+        def generate():
+            try:
+                with torch.no_grad():
+                    self.model.generate(
+                        input_ids,
+                        attention_mask=attention_mask,
+                        past_key_values=past,
+                        max_new_tokens=max_length,
+                        temperature=temperature,
+                        do_sample=True,
+                        pad_token_id=self.tokenizer.eos_token_id,
+                        no_repeat_ngram_size=2,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([_EventStoppingCriteria(stop_event), timer])
+                    )
+                timer.finish(1)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=generate, name="llm-stream", daemon=True)
+        thread.start()
+
+        # Mirror extract_summary(): drop leading whitespace and stop as soon
+        # as the model starts echoing another "Conversation:" block.
+        summary = ""
+        sent = 0
+        finished = False
+        try:
+            for piece in streamer:
+                summary += piece
+                cut = summary.find("Conversation:")
+                if cut != -1:
+                    summary = summary[:cut].rstrip()
+                    stop_event.set()
+                text = summary.lstrip()
+                # Hold back a partial "Conversation:" so it is never shown.
+                safe_end = len(text) if cut != -1 else len(text) - _partial_marker_length(text, "Conversation:")
+                if safe_end > sent:
+                    yield text[sent:safe_end]
+                    sent = safe_end
+                if cut != -1:
+                    break
+            else:
+                finished = True
+                text = summary.strip()
+                if len(text) > sent:
+                    yield text[sent:]
+        finally:
+            stop_event.set()
+            if not finished:
+                # Let generate() wind down so the streamer queue is released.
+                for _ in streamer:
+                    pass
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+
+class _TokenTimer(StoppingCriteria):
+    """Never stops generation; splits its wall time into prefill (up to the first token) and decode.
+
+    Stopping criteria run once per generated token, so the first call marks
+    the end of the prompt forward pass.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.steps = 0
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.steps += 1
+        return torch.zeros((input_ids.shape[0],), dtype=torch.bool, device=input_ids.device)
+
+    def finish(self, batch_size):
+        end = time.perf_counter()
+        first_token = self.first_token or end
+        metrics.record("llm_prefill", first_token - self.start)
+        metrics.record("llm_decode", end - first_token)
+        GENERATED_TOKENS.inc(self.steps * batch_size)
+
+
+class _EventStoppingCriteria(StoppingCriteria):
+    def __init__(self, stop_event):
+        self.stop_event = stop_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.stop_event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+def _partial_marker_length(text, marker):
+    """Length of the longest suffix of text that is a prefix of marker"""
+    for size in range(min(len(marker) - 1, len(text)), 0, -1):
+        if text.endswith(marker[:size]):
+            return size
+    return 0
@@ -1,29 +1,80 @@
-from flask import Flask, render_template, request, redirect, url_for, send_file, jsonify
-import os
-from transformers import AutoTokenizer, AutoModelForCausalLM
 import time
-import speech_recognition as sr
-from gtts import gTTS
+STARTED = time.perf_counter()
+
+from flask import Flask, render_template, request, redirect, url_for, send_file, jsonify, Response, stream_with_context, g
+import os
+import io
+import json
+import zipfile
+import threading
 from datetime import datetime
-from googletrans import Translator
-import torch
 import tempfile
-import google.generativeai as genai
-import pymupdf  # Changed from fitz to pymupdf
 from dotenv import load_dotenv
-from fpdf import FPDF
 import traceback
+import uuid
+import hmac
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from lazy import LazyModule, LazyObject, load_report
+import metrics
+from metrics import span
+from batching import BatchingWorker, QueueFullError
+from model_registry import ModelRegistry
+from extraction import extract_fields, PROMPT_VERSION
+from conversation_store import ConversationShards
+from history_export import EXPORT_FORMATS, buffered, parse_timestamp
+from translation_cache import TranslationCache
+from batch_translate import translate_batch
+from tts_cache import AudioCache
+from tts_stream import split_sentences, stream_audio
+from translation_router import TranslationRouter
+from pipeline import JobPipeline
+from stream_session import SessionManager
+from asr import ASRRouter, GoogleASR, LocalASR
+from pdf_extract import extract_pdf_text, extract_plain_text, UploadTooLarge, pymupdf
+from gemini_client import RateLimitedClient, StubGeminiModel, GeminiConfigError
+from batch_upload import spool_batch, run_batch, combined_report, BatchTooLarge
+from extraction_cache import ExtractionCache
+from report_renderer import render_report, render_many, get_layout
+
+# Heavy subsystems are imported on first use so a worker that only
+# translates never pays for torch or the PDF stack; see /debug/startup.
+sr = LazyModule("speech_recognition")
+gtts = LazyModule("gtts")
+googletrans = LazyModule("googletrans")
+genai = LazyModule("google.generativeai")
+analyzer = LazyModule("analyzer")
 
 app = Flask(__name__)
+# Process pool workers (see process_pool.py) re-import the script started with
+# "python app.py" under this name. They only run functions from the worker
+# modules, so they skip every store, cache and thread the server sets up.
+POOL_WORKER = __name__ == "__mp_main__"
 
 # ========== Configuration ==========
 load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in .env file")
+# GEMINI_STUB=1 swaps in an offline stand-in so extraction can be exercised without an API key.
+GEMINI_STUB = os.getenv("GEMINI_STUB", "") == "1"
+GEMINI_MODEL_NAME = "stub" if GEMINI_STUB else "gemini-1.5-flash"
+
+def create_gemini_model():
+    if GEMINI_STUB:
+        return StubGeminiModel(latency=float(os.getenv("GEMINI_STUB_LATENCY", 0.2)))
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise GeminiConfigError("GOOGLE_API_KEY not found in .env file")
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("gemini-1.5-flash")
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+# Configured on the first extraction, so a missing key only fails uploads.
+model = LazyObject(create_gemini_model, "gemini")
+
+gemini_client = RateLimitedClient(model,
+                                  requests_per_minute=float(os.getenv("GEMINI_RPM", 60)),
+                                  burst=int(os.getenv("GEMINI_BURST", 5)),
+                                  max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", 8)),
+                                  max_retries=int(os.getenv("GEMINI_MAX_RETRIES", 3)))
 
 # ========== Translator Configuration ==========
 LANGUAGES = {
@@ -36,79 +87,212 @@ LANGUAGES = {
 }
 
 history_file = "translated_output.txt"
+# The pre-sharding single history database, kept as the "default" consultation.
+HISTORY_DB = os.getenv("HISTORY_DB", "conversation_history.db")
+# One SQLite file per consultation; clients are told apart by a cookie or the X-Consultation-Id header.
+# A new client starts with an empty history. The pre-sharding history is not copied into anyone's
+# consultation; it stays readable and exportable by sending "X-Consultation-Id: default".
+HISTORY_DIR = os.getenv("HISTORY_DIR", "conversation_history")
+HISTORY_MAX_OPEN_SHARDS = int(os.getenv("HISTORY_MAX_OPEN_SHARDS", 256))
+CONSULTATION_COOKIE = "consultation_id"
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 200))
 
-# ========== Utility Functions ==========
+# ========== Translation Cache Configuration ==========
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 5000))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", 7 * 24 * 3600))
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB", "translation_cache.db")
+TRANSLATION_CACHE_WARM_ENTRIES = int(os.getenv("TRANSLATION_CACHE_WARM_ENTRIES", 2000))
+BATCH_TRANSLATE_WORKERS = int(os.getenv("BATCH_TRANSLATE_WORKERS", 4))
+BATCH_TRANSLATE_MAX_SEGMENTS = int(os.getenv("BATCH_TRANSLATE_MAX_SEGMENTS", 5000))
 
-# ========== GPT-2 Summarizer ==========
-class ConversationAnalyzer:
-    def __init__(self, model_name="gpt2"):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForCausalLM.from_pretrained(model_name).to(self.device)
-
-        if self.tokenizer.pad_token is None:
-            self.tokenizer.pad_token = self.tokenizer.eos_token
-
-    def analyze_conversation(self, conversation_text, max_length=200, temperature=0.7):
-        prompt = f"""Analyze the following doctor-patient conversation and provide a structured summary:
-        1. Identify the patient's main concerns or symptoms
-        2. Note any diagnoses or assessments made by the doctor
-        3. List any recommended treatments or next steps
-        4. Highlight important follow-up information
-        
-        Conversation:
-        {conversation_text.strip()}
-        
-        Analysis Summary:
-        """
-        input_ids = self.tokenizer.encode(prompt, return_tensors="pt").to(self.device)
+# ========== TTS Cache Configuration ==========
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "medvoice_tts"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", 200))
+# Long texts are synthesized a sentence at a time, this many sentences in parallel.
+TTS_CHUNK_WORKERS = int(os.getenv("TTS_CHUNK_WORKERS", 4))
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", 200))
 
-        with torch.no_grad():
-            output = self.model.generate(
-                input_ids,
-                max_length=len(input_ids[0]) + max_length,
-                temperature=temperature,
-                do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id,
-                no_repeat_ngram_size=2
-            )
+# ========== Translator Pipeline Configuration ==========
+# One server microphone means one capture at a time; later stages can overlap.
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", 1))
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", 4))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 4))
+# Each utterance is translated and spoken for every listener language at once on this many threads.
+LISTENER_FANOUT_WORKERS = int(os.getenv("LISTENER_FANOUT_WORKERS", 8))
+LANGUAGE_DETECT_MIN_CONFIDENCE = float(os.getenv("LANGUAGE_DETECT_MIN_CONFIDENCE", 0.5))
+ASR_BACKEND = os.getenv("ASR_BACKEND", "google")
+LOCAL_ASR_MODEL = os.getenv("LOCAL_ASR_MODEL", "openai/whisper-tiny")
+LOCAL_ASR_WORKERS = int(os.getenv("LOCAL_ASR_WORKERS", os.cpu_count() or 1))
+STREAM_ASR_WORKERS = int(os.getenv("STREAM_ASR_WORKERS", 4))
+STREAM_MAX_CHUNK_BYTES = int(os.getenv("STREAM_MAX_CHUNK_BYTES", 1024 * 1024))
+STREAM_FINISH_TIMEOUT = float(os.getenv("STREAM_FINISH_TIMEOUT", 60))
+STREAM_SILENCE_MS = int(os.getenv("STREAM_SILENCE_MS", 600))
 
-        full_output = self.tokenizer.decode(output[0], skip_special_tokens=True)
-        summary_start = full_output.find("Analysis Summary:") + len("Analysis Summary:")
-        summary = full_output[summary_start:].strip()
+# ========== Gemini Extraction Configuration ==========
+GEMINI_CHUNK_CHARS = int(os.getenv("GEMINI_CHUNK_CHARS", 8000))
+GEMINI_MAX_INPUT_CHARS = int(os.getenv("GEMINI_MAX_INPUT_CHARS", 100000))
+GEMINI_MAP_WORKERS = int(os.getenv("GEMINI_MAP_WORKERS", 4))
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB", "extraction_cache.db")
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", 30 * 24 * 3600))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", 10000))
+# Required as X-Admin-Token by /upload/cache/clear; the endpoint is disabled while unset.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
-        if "Conversation:" in summary:
-            summary = summary.split("Conversation:")[0].strip()
+# ========== Upload Configuration ==========
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", 20)) * 1024 * 1024
+PDF_SPOOL_THRESHOLD_BYTES = int(os.getenv("PDF_SPOOL_THRESHOLD_MB", 2)) * 1024 * 1024
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 16))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 500))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_MB", 500)) * 1024 * 1024
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 8))
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", os.cpu_count() or 1))
 
-        return summary
+# ========== LLM Batching Configuration ==========
+LLM_MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", 8))
+LLM_MAX_WAIT_MS = float(os.getenv("LLM_MAX_WAIT_MS", 20))
+LLM_MAX_QUEUE_SIZE = int(os.getenv("LLM_MAX_QUEUE_SIZE", 64))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 300))
+
+# ========== Model Pool Configuration ==========
+AVAILABLE_MODELS = [m.strip() for m in os.getenv("AVAILABLE_MODELS", "gpt2").split(",") if m.strip()]
+MODEL_POOL_SIZE = int(os.getenv("MODEL_POOL_SIZE", 2))
+MODEL_POOL_MEMORY_MB = int(os.getenv("MODEL_POOL_MEMORY_MB", 0))
+PREWARM_MODELS = [m.strip() for m in os.getenv("PREWARM_MODELS", "").split(",") if m.strip()]
+
+# ========== CPU Inference Configuration ==========
+# fp32, int8 (dynamic quantization of the linear layers) or bf16 (needs native CPU support).
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "fp32")
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", 0)) or None
+# Quantized weights are loaded from here, so it must be private to this user (created 0700, ownership checked).
+INFERENCE_CACHE_DIR = os.getenv("INFERENCE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "medvoice_models"))
+
+# ========== Startup Configuration ==========
+# Comma-separated subsystems (see WARM_UPS) or "all", loaded on a background thread at startup.
+WARM_UP = [s.strip() for s in os.getenv("WARM_UP", "").split(",") if s.strip()]
+
+# ========== Metrics Configuration ==========
+# Adds a Server-Timing header to every response; a single request can ask with "X-Timing: 1".
+METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "") == "1"
+
+# ========== Utility Functions ==========
 
 # Globals
-model_processor = None
-current_model_name = None
-translator_engine = Translator()
+translator_engine = LazyObject(lambda: googletrans.Translator(), "translator")
+# Process pool workers skip everything here: opening the stores creates files, and the
+# legacy import, cache warm-up and invalidation must run once, in the server process.
+if not POOL_WORKER:
+    history_shards = ConversationShards(HISTORY_DIR, default_path=HISTORY_DB, max_open=HISTORY_MAX_OPEN_SHARDS)
+    default_store = history_shards.get("default")
+    default_store.import_legacy(history_file)
+    translation_cache = TranslationCache(max_entries=TRANSLATION_CACHE_SIZE,
+                                         ttl_seconds=TRANSLATION_CACHE_TTL,
+                                         disk_path=TRANSLATION_CACHE_DB or None)
+    translation_cache.warm(
+        (entry["source_text"], "auto", entry["target_lang"], entry["translated_text"])
+        for entry in default_store.tail(TRANSLATION_CACHE_WARM_ENTRIES)
+        if entry["translated_text"] != "[Translation error]"
+    )
+    audio_cache = AudioCache(TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024)
+    tts_chunk_executor = ThreadPoolExecutor(max_workers=TTS_CHUNK_WORKERS, thread_name_prefix="tts-chunk")
+    extraction_cache = ExtractionCache(EXTRACTION_CACHE_DB, PROMPT_VERSION, GEMINI_MODEL_NAME,
+                                       ttl_seconds=EXTRACTION_CACHE_TTL,
+                                       max_entries=EXTRACTION_CACHE_MAX_ENTRIES)
+    # Rows written under an older prompt template can never be hit again.
+    extraction_cache.invalidate()
+
+model_registry = ModelRegistry(lambda name: analyzer.ConversationAnalyzer(name,
+                                                                         inference_mode=INFERENCE_MODE,
+                                                                         num_threads=INFERENCE_THREADS,
+                                                                         cache_dir=INFERENCE_CACHE_DIR),
+                               max_models=MODEL_POOL_SIZE,
+                               memory_budget_mb=MODEL_POOL_MEMORY_MB or None,
+                               size_fn=lambda model: model.memory_footprint())
+if PREWARM_MODELS and not POOL_WORKER:
+    model_registry.prewarm(PREWARM_MODELS)
+
+def run_llm_batch(key, texts):
+    """Called by the batching worker with every queued text that shares the same settings.
+
+    Texts arrive already condensed to fit the context (see llm()), so a long
+    transcript's map-reduce never holds up the other queued requests.
+    """
+    processor, max_length, temperature = key
+    return processor.analyze_batch(texts, max_length=max_length, temperature=temperature)
+
+# Starts its thread right away, so not in pool workers.
+if not POOL_WORKER:
+    llm_batcher = BatchingWorker(run_llm_batch,
+                                 max_batch_size=LLM_MAX_BATCH_SIZE,
+                                 max_wait_ms=LLM_MAX_WAIT_MS,
+                                 max_queue_size=LLM_MAX_QUEUE_SIZE)
+
+def format_analysis_report(summary, model_name, temperature):
+    timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
+    return f"""=== Conversation Analysis Report ===
+Timestamp: {timestamp}
+Model: {model_name}
+Temperature: {temperature}
+
+--- Summary ---
+{summary}
+"""
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
 
 # ========== Utility Functions ==========
 def get_language_code(language_name):
     return LANGUAGES.get(language_name, "en")
 
+def transcribe_audio(audio):
+    """Recognize an sr.AudioData clip on whichever ASR backend the router picks"""
+    try:
+        with span("asr"):
+            return asr_router.transcribe(audio)
+    except Exception as e:
+        return f"Speech Recognition Error: {e}"
+
 def recognize_speech():
     recognizer = sr.Recognizer()
     with sr.Microphone() as source:
         print("Listening...")
         recognizer.pause_threshold = 1
-        audio = recognizer.listen(source, phrase_time_limit=10)
-    try:
-        print("Recognizing...")
-        return recognizer.recognize_google(audio)
-    except sr.UnknownValueError:
-        return ""
-    except sr.RequestError as e:
-        return f"Speech Recognition Error: {e}"
+        with span("mic_capture"):
+            audio = recognizer.listen(source, phrase_time_limit=10)
+    print("Recognizing...")
+    return transcribe_audio(audio)
+
+def remote_translate(text, src, dest):
+    with span("translate_remote"):
+        return translator_engine.translate(text, src=src, dest=dest).text
+
+def remote_translate_many(texts, src, dest):
+    with span("translate_remote"):
+        return [result.text for result in translator_engine.translate(texts, src=src, dest=dest)]
+
+def detect_language(text):
+    with span("detect_language"):
+        detected = translator_engine.detect(text)
+    return detected.lang, detected.confidence
+
+def translate_segments(segments, target_lang_codes, src="auto"):
+    """Batch-translate many segments into several languages; returns ({code: [text, ...]}, stats)"""
+    with span("translate_batch"):
+        return translate_batch(segments, target_lang_codes, translation_cache, remote_translate,
+                               translate_many=remote_translate_many, src=src,
+                               max_workers=BATCH_TRANSLATE_WORKERS)
+
+def translate_for_listeners(text, target_lang_codes):
+    """One utterance into several languages through the batch path: cache hits, then one request per missing language"""
+    translations, _ = translate_segments([text], target_lang_codes)
+    return {code: translations[code][0] for code in target_lang_codes}
 
 def translate_text(text, target_lang_code):
     try:
-        translated = translator_engine.translate(text, dest=target_lang_code)
-        return translated.text
+        with span("translate"):
+            return translation_cache.get_or_translate(text, "auto", target_lang_code, remote_translate)
     except Exception as e:
         print(f"Error in translate_text: {e}")
         return "[Translation error]"
@@ -117,72 +301,201 @@ def speak_text(text, lang_code):
     """Wrapper function that uses text_to_voice"""
     text_to_voice(text, lang_code)
 
-def translate_and_speak(speaker, target_lang_name):
-    target_lang_code = get_language_code(target_lang_name)
-    spoken_text = recognize_speech()
-    if not spoken_text:
-        return f"{speaker} said nothing or speech could not be recognized."
+# ========== Translator Pipeline Stages ==========
+# Each stage takes and returns the job context; returning None ends the job
+# early with the context as its result.
+def asr_stage(job):
+    job["spoken_text"] = recognize_speech()
+    if not job["spoken_text"]:
+        job["message"] = f"{job['speaker']} said nothing or speech could not be recognized."
+        return None
+    return job
+
+def translate_stage(job):
+    job["target_lang_code"] = get_language_code(job["target_lang_name"])
+    listener_codes = [get_language_code(name) for name in job.get("listener_lang_names", ())]
+    source_lang_name = job.get("source_lang_name")
+    # Detected once per consultation, speaker and selected language; the selected language is the fallback.
+    job["source_lang_code"] = translation_router.source_language(
+        (job["consultation_id"], job["speaker"]), job["spoken_text"],
+        hint=get_language_code(source_lang_name) if source_lang_name else None)
+    job["translations"] = translation_router.translate(job["spoken_text"], job["source_lang_code"],
+                                                       [job["target_lang_code"], *listener_codes])
+    job["translated"] = job["translations"][job["target_lang_code"]]["text"]
+    return job
 
-    translated = translate_text(spoken_text, target_lang_code)
-    speak_text(translated, target_lang_code)
+def tts_stage(job):
+    # Targets already in the source language were skipped and are not spoken either.
+    translation_router.speak(job["translations"])
 
     timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    with open(history_file, "a", encoding="utf-8") as f:
-        f.write(f"{timestamp} {speaker} said: {spoken_text}\n")
-        f.write(f"{timestamp} Translated: {translated}\n")
+    with span("history_write"):
+        history_shards.get(job["consultation_id"]).append(
+            job["speaker"], job["spoken_text"], job["translated"],
+            source_lang=job["source_lang_code"],
+            target_lang=job["target_lang_code"],
+            timestamp=timestamp.strip("[]"))
+
+    job["message"] = f"{timestamp} {job['speaker']} said: {job['spoken_text']}\n{timestamp} Translated: {job['translated']}"
+    for code, output in job["translations"].items():
+        if code != job["target_lang_code"]:
+            job["message"] += f"\n{timestamp} Translated ({code}): {output['text']}"
+    return job
+
+def synthesize_speech(text_data, to_language, slow, path):
+    with span("tts_synthesize"):
+        gtts.gTTS(text=text_data, lang=to_language, slow=slow).save(path)
 
-    return f"{timestamp} {speaker} said: {spoken_text}\n{timestamp} Translated: {translated}"
+def synthesize_chunk(text_data, to_language, slow=False):
+    """Path of the cached MP3 for one sentence chunk"""
+    path, _ = audio_cache.get_or_create(text_data, to_language, slow, synthesize_speech)
+    return path
 
-def text_to_voice(text_data, to_language):
+def text_to_voice(text_data, to_language, slow=False):
+    """Return the paths of the cached MP3s for this text, one per sentence chunk.
+
+    Chunks are synthesized in parallel and cached separately, so /get-audio
+    can later stream the same text straight from the cache.
+    """
     try:
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_audio:
-            temp_path = temp_audio.name
-        myobj = gTTS(text=text_data, lang=to_language, slow=False)
-        myobj.save(temp_path)
-        return temp_path
+        with span("tts"):
+            chunks = split_sentences(text_data, TTS_CHUNK_MAX_CHARS)
+            return list(tts_chunk_executor.map(lambda chunk: synthesize_chunk(chunk, to_language, slow), chunks))
     except Exception as e:
         print(f"Error in text_to_voice: {e}")
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         return None
 
-def read_conversation_history():
-    conversation = []
-    try:
-        with open(history_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            for i in range(0, len(lines), 2):
-                if i + 1 < len(lines):
-                    line1 = lines[i].strip()
-                    line2 = lines[i + 1].strip()
-                    speaker = "doctor" if "Doctor said" in line1 else "patient" if "Patient said" in line1 else "unknown"
-                    text_part = line2.split("Translated: ")[1] if "Translated: " in line2 else line2
-                    timestamp = line2.split("]")[0] + "]" if "]" in line2 else ""
-                    conversation.append({"speaker": speaker, "text": f"{timestamp} {text_part}"})
-    except FileNotFoundError:
-        conversation = []
-    return conversation
-
-def extract_text(file):
-    """Extract text from uploaded PDF or text file"""
+def current_consultation_id():
+    """The consultation this request belongs to, from the X-Consultation-Id header or cookie.
+
+    A client without a valid id gets a new one, sent back as a cookie by
+    set_consultation_cookie(), so each browser starts its own history shard.
+    """
+    consultation_id = request.headers.get("X-Consultation-Id") or request.cookies.get(CONSULTATION_COOKIE)
+    if history_shards.is_valid_id(consultation_id):
+        return consultation_id
+    if not g.get("new_consultation_id"):
+        g.new_consultation_id = uuid.uuid4().hex
+    return g.new_consultation_id
+
+def current_store(create=False):
+    """This consultation's store; only writers pass create=True, so reads never create a shard file"""
+    return history_shards.get(current_consultation_id(), create=create)
+
+def history_entry(entry):
+    speaker = entry["speaker"] if entry["speaker"] in ("doctor", "patient") else "unknown"
+    return {"id": entry["id"], "speaker": speaker, "text": f"[{entry['timestamp']}] {entry['translated_text']}"}
+
+def read_conversation_history(store):
+    with span("history_read"):
+        entries = store.tail(HISTORY_PAGE_SIZE)
+    return [history_entry(entry) for entry in entries]
+
+# A history cursor is "<generation>.<last entry id>"; the generation changes when the shard is cleared.
+def history_cursor(generation, entry_id):
+    return f"{generation}.{entry_id}"
+
+def parse_history_cursor(cursor):
     try:
-        if file.filename.endswith(".pdf"):
-            # Open PDF document from file stream
-            doc = pymupdf.open(stream=file.read(), filetype="pdf")
-            text = []
-            for page in doc:
-                text.append(page.get_text())
-            return "\n".join(text)
-        
-        elif file.filename.endswith(".txt"):
-            return file.read().decode("utf-8")
-        
-        else:
-            return f"Unsupported file type: {file.filename.split('.')[-1]}"
-            
-    except Exception as e:
-        print(f"Error extracting text: {e}")
-        return f"Error reading file: {str(e)}"
+        generation, entry_id = (int(part) for part in cursor.split("."))
+        return generation, entry_id
+    except (AttributeError, ValueError):
+        return None
+
+def extract_text(file, char_budget=None):
+    """Extract text from uploaded PDF or text file, stopping after char_budget characters"""
+    if file.filename.endswith(".pdf"):
+        with span("pdf_extract"):
+            return extract_pdf_text(file.stream, char_budget=char_budget,
+                                    max_bytes=MAX_UPLOAD_BYTES,
+                                    spool_threshold=PDF_SPOOL_THRESHOLD_BYTES,
+                                    parallel_min_pages=PDF_PARALLEL_MIN_PAGES)
+    elif file.filename.endswith(".txt"):
+        with span("text_extract"):
+            return extract_plain_text(file.stream, char_budget=char_budget, max_bytes=MAX_UPLOAD_BYTES)
+    else:
+        raise ValueError(f"Unsupported file type: {file.filename.split('.')[-1]}")
+
+def recognize_pcm(pcm, sample_rate):
+    """Recognize one utterance of 16-bit mono PCM"""
+    return transcribe_audio(sr.AudioData(pcm, sample_rate, 2))
+
+asr_backends = [GoogleASR()]
+if ASR_BACKEND in ("local", "auto"):
+    asr_backends.append(LocalASR(LOCAL_ASR_MODEL, workers=LOCAL_ASR_WORKERS))
+asr_router = ASRRouter(asr_backends, mode=ASR_BACKEND)
+
+recording_sessions = SessionManager(workers=STREAM_ASR_WORKERS,
+                                    vad_options={"min_silence_ms": STREAM_SILENCE_MS})
+
+translation_router = TranslationRouter(
+    detect_language, translate_for_listeners, speak_text,
+    ThreadPoolExecutor(max_workers=LISTENER_FANOUT_WORKERS, thread_name_prefix="listener-fanout"),
+    min_confidence=LANGUAGE_DETECT_MIN_CONFIDENCE)
+
+translator_pipeline = JobPipeline([
+    ("asr", asr_stage, ASR_WORKERS),
+    ("translate", translate_stage, TRANSLATE_WORKERS),
+    ("tts", tts_stage, TTS_WORKERS),
+])
+
+# ========== Metrics ==========
+HTTP_SECONDS = metrics.Histogram("medvoice_http_request_seconds", "Request handling time by endpoint")
+
+def _cache_counts(counter):
+    return {
+        "translation": sum(translation_cache.stats()[k] for k in counter.get("translation", ())),
+        "tts": audio_cache.stats()[counter["tts"]],
+        "extraction": extraction_cache.stats()[counter["extraction"]],
+    }
+
+metrics.CallbackMetric("medvoice_cache_hits_total", "Cache hits by cache", kind="counter", label_name="cache",
+                       fn=lambda: _cache_counts({"translation": ("memory_hits", "disk_hits"), "tts": "hits", "extraction": "hits"}))
+metrics.CallbackMetric("medvoice_cache_misses_total", "Cache misses by cache", kind="counter", label_name="cache",
+                       fn=lambda: _cache_counts({"translation": ("misses",), "tts": "misses", "extraction": "misses"}))
+metrics.CallbackMetric("medvoice_queue_depth", "Work waiting to be processed", label_name="queue",
+                       fn=lambda: {"llm_batch": llm_batcher.stats()["queue_depth"],
+                                   "translator_jobs": translator_pipeline.stats()["active"],
+                                   "recording_segments": recording_sessions.stats()["pending_segments"]})
+metrics.CallbackMetric("medvoice_model_loads_total", "LLM loads by the model registry", kind="counter",
+                       fn=lambda: model_registry.stats()["loads"])
+metrics.CallbackMetric("medvoice_models_loaded", "LLMs currently resident",
+                       fn=lambda: len(model_registry.loaded_models()))
+metrics.CallbackMetric("medvoice_translation_router_total", "Language detections and per-listener routing", kind="counter",
+                       label_name="event",
+                       fn=lambda: {k: v for k, v in translation_router.stats().items() if k != "sessions"})
+metrics.CallbackMetric("medvoice_gemini_requests_total", "Gemini calls, retries and failures", kind="counter", label_name="event",
+                       fn=gemini_client.stats)
+
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.timing_header = METRICS_TIMING_HEADER or request.headers.get("X-Timing") == "1"
+    if g.timing_header:
+        metrics.start_request()
+
+@app.after_request
+def finish_request_timing(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    HTTP_SECONDS.observe(elapsed, endpoint=request.endpoint or "unknown", method=request.method,
+                         status=response.status_code)
+    if g.get("timing_header"):
+        # Covers spans on this request's thread; work handed to pools is only in /metrics.
+        response.headers["Server-Timing"] = metrics.server_timing_header(metrics.end_request(), total=elapsed)
+    return response
+
+@app.after_request
+def set_consultation_cookie(response):
+    if g.get("new_consultation_id"):
+        response.set_cookie(CONSULTATION_COOKIE, g.new_consultation_id, httponly=True, samesite="Lax")
+    return response
+
+@app.route("/metrics")
+def metrics_route():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 # ========== Routes ==========
 @app.route("/")
@@ -191,74 +504,260 @@ def home():
 
 @app.route("/translator", methods=["GET", "POST"])
 def translator():
-    message, sender = "", ""
+    message, sender, job_id = "", "", ""
     doctor_lang = "English"
     patient_lang = "Hindi"
+    listener_langs = []
 
     if request.method == "POST":
         doctor_lang = request.form.get("doctor_lang", "English")
         patient_lang = request.form.get("patient_lang", "Hindi")
+        listener_langs = [name for name in request.form.getlist("listener_langs") if name in LANGUAGES]
         action = request.form.get("action")
 
-        if action == "doctor":
-            sender = "doctor"
-            message = translate_and_speak("Doctor", patient_lang)
-        elif action == "patient":
-            sender = "patient"
-            message = translate_and_speak("Patient", doctor_lang)
+        if action in ("doctor", "patient"):
+            sender = action
+            if action == "doctor":
+                job = {"speaker": "Doctor", "target_lang_name": patient_lang, "source_lang_name": doctor_lang}
+            else:
+                job = {"speaker": "Patient", "target_lang_name": doctor_lang, "source_lang_name": patient_lang}
+            job["sender"] = sender
+            job["consultation_id"] = current_consultation_id()
+            job["listener_lang_names"] = listener_langs
+            job_id = translator_pipeline.submit(job)
+            if request.accept_mimetypes.best == "application/json":
+                return jsonify({"job_id": job_id, "status_url": url_for("translator_job", job_id=job_id)}), 202
         elif action == "clear":
-            open(history_file, "w").close()
+            # Only this consultation's shard; other clients keep their history.
+            current_store().clear()
+            for speaker in ("Doctor", "Patient"):
+                translation_router.forget((current_consultation_id(), speaker))
             return redirect(url_for("translator"))
 
-    conversation = read_conversation_history()
+    store = current_store()
+    # Read the generation first: a clear in between then makes the page's first delta a reset.
+    generation, _ = store.version()
+    conversation = read_conversation_history(store)
+    history_after = history_cursor(generation, conversation[-1]["id"] if conversation else 0)
     return render_template("translator.html",
                          message=message,
                          sender=sender,
+                         job_id=job_id,
                          doctor_lang=doctor_lang,
                          patient_lang=patient_lang,
+                         listener_langs=listener_langs,
                          languages=LANGUAGES,
-                         conversation=conversation)
+                         conversation=conversation,
+                         history_cursor=history_after)
+
+@app.route("/translator/history")
+def translator_history():
+    """Entries after ?after=<cursor>: {"entries", "cursor", "reset", "more"}.
+
+    The ETag is the cursor of the newest entry, so a client that sends its
+    cursor as If-None-Match gets an empty 304 until something changes.
+    Without a usable cursor, or after a clear, the response is the last
+    HISTORY_PAGE_SIZE entries with reset set.
+    """
+    store = current_store()
+    generation, last_id = store.version()
+    if request.if_none_match.contains(history_cursor(generation, last_id)):
+        response = Response(status=304)
+        response.set_etag(history_cursor(generation, last_id))
+        return response
+
+    after = parse_history_cursor(request.args.get("after"))
+    reset = after is None or after[0] != generation
+    with span("history_read"):
+        entries = store.tail(HISTORY_PAGE_SIZE) if reset else store.entries_after(after[1], HISTORY_PAGE_SIZE)
+    if entries:
+        entry_id = entries[-1]["id"]
+    else:
+        entry_id = 0 if reset else after[1]
+    cursor = history_cursor(generation, entry_id)
+
+    response = jsonify({
+        "entries": [history_entry(entry) for entry in entries],
+        "cursor": cursor,
+        "reset": reset,
+        "more": entry_id < last_id,
+    })
+    response.set_etag(cursor)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route("/translator/jobs/<job_id>")
+def translator_job(job_id):
+    job = translator_pipeline.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    result = job.pop("result") or {}
+    job.update({
+        "sender": result.get("sender"),
+        "message": result.get("message"),
+        "spoken_text": result.get("spoken_text"),
+        "translated": result.get("translated"),
+        "source_lang": result.get("source_lang_code"),
+        "translations": result.get("translations"),
+    })
+    return jsonify(job)
 
 @app.route("/download_file")
 def download_file():
-    return send_file(history_file, as_attachment=True)
+    """Stream this consultation's history as ?format=txt|jsonl|csv|pdf.
+
+    Optional filters: ?from= and ?to= (dates or date-times, inclusive),
+    ?speaker=doctor,patient and ?lang= to re-translate into that language.
+    Entries are read, translated and written a page at a time, so memory
+    stays flat however long the history is.
+    """
+    lang = request.args.get("lang")
+    target_lang_code = LANGUAGES.get(lang, lang)
+    if target_lang_code and target_lang_code not in LANGUAGES.values():
+        return jsonify({"error": f"Unsupported language: {lang}"}), 400
+    export_format = request.args.get("format", "txt").lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format: {export_format}", "formats": list(EXPORT_FORMATS)}), 400
+    filters = {}
+    try:
+        if request.args.get("from"):
+            filters["since"] = parse_timestamp(request.args["from"])
+        if request.args.get("to"):
+            filters["until"] = parse_timestamp(request.args["to"], end_of_day=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    speakers = [s.strip() for s in request.args.get("speaker", "").split(",") if s.strip()]
+    if speakers:
+        filters["speakers"] = speakers
+    store = current_store()
+
+    def entries():
+        if not target_lang_code:
+            yield from store.iter_entries(HISTORY_PAGE_SIZE, **filters)
+            return
+        # Re-translate the spoken text a page at a time, a few round trips per page.
+        page = []
+        for entry in store.iter_entries(HISTORY_PAGE_SIZE, **filters):
+            page.append(entry)
+            if len(page) == HISTORY_PAGE_SIZE:
+                yield from translate_history_page(page, target_lang_code)
+                page = []
+        if page:
+            yield from translate_history_page(page, target_lang_code)
+
+    exporter, mimetype = EXPORT_FORMATS[export_format]
+    base_name = os.path.splitext(history_file)[0]
+    if target_lang_code:
+        base_name = f"{base_name}_{target_lang_code}"
+    # No Content-Length, so the response goes out with chunked transfer encoding.
+    return Response(stream_with_context(buffered(exporter(entries()))),
+                    mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={base_name}.{export_format}"})
+
+def translate_history_page(entries, target_lang_code):
+    translations, _ = translate_segments([entry["source_text"] for entry in entries], [target_lang_code])
+    for entry, translated in zip(entries, translations[target_lang_code]):
+        yield dict(entry, translated_text=translated, target_lang=target_lang_code)
+
+@app.route("/translate/batch", methods=["POST"])
+def translate_batch_route():
+    """Translate {"segments": [...], "targets": [...]} in one request; targets are codes or language names"""
+    data = request.get_json(silent=True) or {}
+    segments = data.get("segments")
+    targets = data.get("targets")
+    if not isinstance(segments, list) or not all(isinstance(s, str) for s in segments):
+        return jsonify({"error": "segments must be a list of strings"}), 400
+    if not isinstance(targets, list) or not targets:
+        return jsonify({"error": "targets must be a non-empty list"}), 400
+    if len(segments) > BATCH_TRANSLATE_MAX_SEGMENTS:
+        return jsonify({"error": f"At most {BATCH_TRANSLATE_MAX_SEGMENTS} segments per request"}), 413
+
+    codes = []
+    for target in targets:
+        code = LANGUAGES.get(target, target)
+        if code not in LANGUAGES.values():
+            return jsonify({"error": f"Unsupported language: {target}"}), 400
+        if code not in codes:
+            codes.append(code)
+
+    start = time.perf_counter()
+    translations, stats = translate_segments(segments, codes, src=data.get("src", "auto"))
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return jsonify({"translations": translations, "stats": stats})
+
+@app.route("/translator/cache")
+def translation_cache_stats():
+    return jsonify(translation_cache.stats())
 
 @app.route("/llm", methods=["GET", "POST"])
 def llm():
-    global model_processor, current_model_name
-
     if request.method == "POST":
         text = request.form.get("text", "")
-        model_name = request.form.get("model", "gpt2")
+        model_name = request.form.get("model", AVAILABLE_MODELS[0])
         max_length = int(request.form.get("max_length", 150))
         temperature = float(request.form.get("temperature", 0.7))
 
+        if model_name not in AVAILABLE_MODELS:
+            return render_template("llm.html", available_models=AVAILABLE_MODELS, default_model=AVAILABLE_MODELS[0], default_length=max_length, default_temp=temperature, error=f"Unknown model: {model_name}"), 400
         if not text.strip():
-            return render_template("llm.html", available_models=["gpt2"], default_model=model_name, default_length=max_length, default_temp=temperature, error="Input text is empty")
-
-        if model_processor is None or current_model_name != model_name:
-            try:
-                model_processor = ConversationAnalyzer(model_name)
-                current_model_name = model_name
-            except Exception as e:
-                return render_template("llm.html", available_models=["gpt2"], default_model=model_name, default_length=max_length, default_temp=temperature, error=str(e))
+            return render_template("llm.html", available_models=AVAILABLE_MODELS, default_model=model_name, default_length=max_length, default_temp=temperature, error="Input text is empty")
 
         try:
-            summary = model_processor.analyze_conversation(text, max_length=max_length, temperature=temperature)
-            timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-            formatted_output = f"""=== Conversation Analysis Report ===
-Timestamp: {timestamp}
-Model: {model_name}
-Temperature: {temperature}
+            # Loading happens on this request's thread, so a cold model never
+            # stalls the batching worker serving models that are already warm.
+            with span("model_load"):
+                processor = model_registry.get(model_name)
+            # Long transcripts are map-reduced here too, for the same reason.
+            with span("llm_condense"):
+                text = processor.condense(text, max_length=max_length, temperature=temperature)
+            # Prefill and decode are timed inside generate() on the batching worker.
+            with span("llm"):
+                summary = llm_batcher.run((processor, max_length, temperature), text, timeout=LLM_REQUEST_TIMEOUT)
+            formatted_output = format_analysis_report(summary, model_name, temperature)
+            return render_template("llm.html", available_models=AVAILABLE_MODELS, default_model=model_name, default_length=max_length, default_temp=temperature, result=formatted_output)
+        except QueueFullError as e:
+            return render_template("llm.html", available_models=AVAILABLE_MODELS, default_model=model_name, default_length=max_length, default_temp=temperature, error=f"Server busy, please retry: {e}"), 503
+        except Exception as e:
+            return render_template("llm.html", available_models=AVAILABLE_MODELS, default_model=model_name, default_length=max_length, default_temp=temperature, error=str(e))
 
---- Summary ---
-{summary}
-"""
-            return render_template("llm.html", available_models=["gpt2"], default_model=model_name, default_length=max_length, default_temp=temperature, result=formatted_output)
+    return render_template("llm.html", available_models=AVAILABLE_MODELS, default_model=AVAILABLE_MODELS[0], default_length=150, default_temp=0.7)
+
+@app.route("/llm/stream", methods=["POST"])
+def llm_stream():
+    """Stream summary tokens as Server-Sent Events while generate() is running"""
+    text = request.form.get("text", "")
+    model_name = request.form.get("model", AVAILABLE_MODELS[0])
+    max_length = int(request.form.get("max_length", 150))
+    temperature = float(request.form.get("temperature", 0.7))
+
+    if model_name not in AVAILABLE_MODELS:
+        return jsonify({"error": f"Unknown model: {model_name}"}), 400
+    if not text.strip():
+        return jsonify({"error": "Input text is empty"}), 400
+
+    def generate():
+        summary = ""
+        try:
+            processor = model_registry.get(model_name)
+            for piece in processor.stream_conversation(text, max_length=max_length, temperature=temperature):
+                summary += piece
+                yield sse_event({"token": piece})
+            yield sse_event({"result": format_analysis_report(summary.strip(), model_name, temperature)}, event="done")
         except Exception as e:
-            return render_template("llm.html", available_models=["gpt2"], default_model=model_name, default_length=max_length, default_temp=temperature, error=str(e))
+            traceback.print_exc()
+            yield sse_event({"error": str(e)}, event="error")
+
+    return Response(stream_with_context(generate()),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/llm/stats")
+def llm_stats():
+    return jsonify(llm_batcher.stats())
 
-    return render_template("llm.html", available_models=["gpt2"], default_model="gpt2", default_length=150, default_temp=0.7)
+@app.route("/llm/models")
+def llm_models():
+    return jsonify(model_registry.stats())
 
 @app.route("/chatbot", methods=["GET", "POST"])
 def chatbot():
@@ -268,6 +767,9 @@ def chatbot():
 @app.route("/upload", methods=["POST"])
 def upload_file():
     try:
+        if request.content_length and request.content_length > MAX_UPLOAD_BYTES:
+            return jsonify({"error": f"File too large. Maximum size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"}), 413
+
         if 'file' not in request.files:
             return jsonify({"error": "No file part"}), 400
             
@@ -283,68 +785,21 @@ def upload_file():
         # Read file content safely
         file_content = ""
         try:
-            if uploaded_file.filename.endswith('.pdf'):
-                doc = pymupdf.open(stream=uploaded_file.read(), filetype="pdf")
-                file_content = "\n".join([page.get_text() for page in doc])
-            else:
-                file_content = uploaded_file.read().decode('utf-8')
+            file_content = extract_text(uploaded_file, char_budget=GEMINI_MAX_INPUT_CHARS)
+        except UploadTooLarge as e:
+            return jsonify({"error": str(e)}), 413
         except Exception as e:
             return jsonify({"error": f"Error reading file: {str(e)}"}), 400
 
         if not file_content.strip():
             return jsonify({"error": "Empty file content"}), 400
 
-        prompt = """Analyze this doctor-patient conversation and extract the following information:
-        - Patient Name: [extract full name]
-        - Age: [extract age]
-        - Symptoms: [list all symptoms]
-        - Diagnosis: [medical condition]
-        - Prescribed Medication: [list medications]
-        - Follow-up Date: [extract date if mentioned]
-
-        Return the information in this exact format:
-        Patient Name: [value]
-        Age: [value]
-        Symptoms: [value]
-        Diagnosis: [value]
-        Prescribed Medication: [value]
-        Follow-up Date: [value]
-
-        Conversation:
-        """ + file_content[:2000]  # Limit to first 2000 characters
-
         try:
-            response = model.generate_content(prompt)
-            if not response.text:
-                raise ValueError("Empty response from AI model")
-                
-            extracted = response.text
-
-            # Generate PDF
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            
-            # Add title
-            pdf.cell(200, 10, txt="Medical Consultation Summary", ln=1, align='C')
-            pdf.ln(10)
-            
-            # Add extracted content
-            for line in extracted.splitlines():
-                if ':' in line:  # Only process lines with field: value format
-                    field, value = line.split(':', 1)
-                    pdf.set_font("Arial", 'B', 12)
-                    pdf.cell(50, 10, txt=f"{field}:", ln=0)
-                    pdf.set_font("Arial", '', 12)
-                    pdf.multi_cell(0, 10, txt=value.strip())
-                    pdf.ln(5)
-
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                pdf_output_path = tmp_file.name
-                pdf.output(pdf_output_path)
-
-            return send_file(pdf_output_path, as_attachment=True, download_name="consultation_summary.pdf")
+            fields = extract_fields_cached(file_content)
+            with span("pdf_render"):
+                report = render_report(fields)
+            return send_file(io.BytesIO(report), mimetype="application/pdf",
+                             as_attachment=True, download_name="consultation_summary.pdf")
 
         except Exception as e:
             traceback.print_exc()
@@ -355,6 +810,100 @@ def upload_file():
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
 
+def extract_fields_cached(text):
+    """Gemini field extraction, skipped entirely when the same document was extracted before"""
+    with span("extraction"):
+        return extraction_cache.get_or_extract(text, lambda text: extract_fields(
+            gemini_client, text,
+            chunk_chars=GEMINI_CHUNK_CHARS,
+            max_chars=GEMINI_MAX_INPUT_CHARS,
+            max_workers=GEMINI_MAP_WORKERS))
+
+def extract_document_fields(filename, path):
+    """Batch worker: text extraction plus Gemini field extraction for one spooled file"""
+    with open(path, "rb") as f:
+        if filename.lower().endswith(".pdf"):
+            with span("pdf_extract"):
+                text = extract_pdf_text(f, char_budget=GEMINI_MAX_INPUT_CHARS,
+                                        max_bytes=MAX_UPLOAD_BYTES,
+                                        spool_threshold=PDF_SPOOL_THRESHOLD_BYTES,
+                                        parallel_min_pages=PDF_PARALLEL_MIN_PAGES)
+        else:
+            with span("text_extract"):
+                text = extract_plain_text(f, char_budget=GEMINI_MAX_INPUT_CHARS, max_bytes=MAX_UPLOAD_BYTES)
+    if not text.strip():
+        raise ValueError("Empty file content")
+    return extract_fields_cached(text)
+
+@app.route("/upload/batch", methods=["POST"])
+def upload_batch():
+    """Extract many PDF/TXT files (or zip archives of them) in one request"""
+    try:
+        if request.content_length and request.content_length > BATCH_MAX_BYTES:
+            return jsonify({"error": f"Batch too large. Maximum size is {BATCH_MAX_BYTES // (1024 * 1024)} MB"}), 413
+
+        files = request.files.getlist("files")
+        if not files:
+            return jsonify({"error": "No files uploaded"}), 400
+
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="medvoice_batch_") as batch_dir:
+            try:
+                spooled = spool_batch(files, batch_dir,
+                                      max_files=BATCH_MAX_FILES,
+                                      max_file_bytes=MAX_UPLOAD_BYTES,
+                                      max_total_bytes=BATCH_MAX_BYTES)
+            except BatchTooLarge as e:
+                return jsonify({"error": str(e)}), 413
+            # In upload order, skipped files included.
+            results = run_batch(spooled, extract_document_fields, max_workers=BATCH_WORKERS)
+
+        if request.args.get("format") == "zip":
+            return send_file(io.BytesIO(batch_reports_zip(results)), mimetype="application/zip",
+                             as_attachment=True, download_name="consultation_summaries.zip")
+
+        succeeded = sum(1 for r in results if r["status"] == "ok")
+        return jsonify({
+            "summary": {
+                "total": len(results),
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "seconds": round(time.perf_counter() - start, 3),
+            },
+            "files": results,
+            "report": combined_report(results),
+        })
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
+
+def batch_reports_zip(results):
+    """One summary PDF per successful file, rendered on the worker pool and zipped in memory"""
+    ok = [r for r in results if r["status"] == "ok"]
+    with span("pdf_render_batch"):
+        reports = render_many([r["fields"] for r in ok], max_workers=REPORT_RENDER_WORKERS)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for index, (result, report) in enumerate(zip(ok, reports)):
+            name = os.path.splitext(os.path.basename(result["filename"]))[0] or "document"
+            archive.writestr(f"{index:04d}_{name}.pdf", report)
+        archive.writestr("report.txt", combined_report(results))
+    return buffer.getvalue()
+
+@app.route("/upload/stats")
+def upload_stats():
+    return jsonify({"gemini": gemini_client.stats(), "extraction_cache": extraction_cache.stats()})
+
+@app.route("/upload/cache/clear", methods=["POST"])
+def clear_extraction_cache():
+    """Drop the cached extractions of the current prompt version and model, or every entry with ?all=1"""
+    if not ADMIN_TOKEN or not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "Forbidden"}), 403
+    if request.args.get("all") == "1":
+        return jsonify({"deleted": extraction_cache.invalidate(all_versions=True)})
+    return jsonify({"deleted": extraction_cache.clear()})
+
 # @app.route('/chatbots')
 # def chatbots():
 #     return render_template("chatbots.html")
@@ -405,38 +954,200 @@ def save_recording():
         recognizer = sr.Recognizer()
         with sr.AudioFile(audio_path) as source:
             audio = recognizer.record(source)
-        try:
-            recognized_text = recognizer.recognize_google(audio)
-        except sr.UnknownValueError:
-            recognized_text = ""
-        except sr.RequestError as e:
-            recognized_text = f"Speech Recognition Error: {e}"
+        recognized_text = transcribe_audio(audio)
         os.remove(audio_path)
         # Optionally, translate the recognized text (default to Hindi for demo)
         target_lang_code = request.form.get('target_lang', 'hi')
         translated = translate_text(recognized_text, target_lang_code) if recognized_text else ""
         # Save to conversation history
-        timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        with open(history_file, "a", encoding="utf-8") as f:
-            f.write(f"{timestamp} Uploaded said: {recognized_text}\n")
-            f.write(f"{timestamp} Translated: {translated}\n")
+        with span("history_write"):
+            current_store(create=True).append("Uploaded", recognized_text, translated,
+                                              target_lang=target_lang_code)
         return jsonify({"recognized_text": recognized_text, "translated": translated})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/save-recording/stream", methods=["POST"])
+def start_recording_stream():
+    """Open a chunked recording; the client then POSTs raw 16-bit mono PCM to chunk_url"""
+    options = request.get_json(silent=True) or request.form
+    target_lang_code = options.get("target_lang", "hi")
+    try:
+        sample_rate = int(options.get("sample_rate", 16000))
+    except ValueError:
+        return jsonify({"error": "Invalid sample_rate"}), 400
+    if not 8000 <= sample_rate <= 48000:
+        return jsonify({"error": "sample_rate must be between 8000 and 48000"}), 400
+    # Segments finish on worker threads, outside this request, so bind the consultation now.
+    consultation_id = current_consultation_id()
+
+    def process_segment(pcm):
+        recognized_text = recognize_pcm(pcm, sample_rate)
+        translated = translate_text(recognized_text, target_lang_code) if recognized_text else ""
+        return {"recognized_text": recognized_text, "translated": translated}
+
+    def save_result(result):
+        if result.get("recognized_text"):
+            with span("history_write"):
+                history_shards.get(consultation_id).append(
+                    "Uploaded", result["recognized_text"], result["translated"], target_lang=target_lang_code)
+
+    session = recording_sessions.create(process_segment, on_result=save_result, sample_rate=sample_rate)
+    return jsonify({
+        "session_id": session.id,
+        "chunk_url": url_for("recording_stream_chunk", session_id=session.id),
+        "events_url": url_for("recording_stream_events", session_id=session.id),
+        "finish_url": url_for("finish_recording_stream", session_id=session.id),
+    }), 201
+
+@app.route("/save-recording/stream/<session_id>/chunk", methods=["POST"])
+def recording_stream_chunk(session_id):
+    """Feed a PCM chunk; the response carries every result finished since ?after="""
+    session = recording_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired recording"}), 404
+    if request.content_length and request.content_length > STREAM_MAX_CHUNK_BYTES:
+        return jsonify({"error": "Chunk too large"}), 413
+    try:
+        session.feed(request.get_data())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    after = request.args.get("after", 0, type=int)
+    return jsonify({"results": session.wait(after, timeout=0), "pending": session.pending})
+
+@app.route("/save-recording/stream/<session_id>/events")
+def recording_stream_events(session_id):
+    """Server-Sent Events: one "segment" event per utterance, then "done" """
+    session = recording_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired recording"}), 404
+
+    def generate():
+        sent = request.args.get("after", 0, type=int)
+        while True:
+            results = session.wait(sent, timeout=15)
+            for result in results:
+                yield sse_event(result, event="segment")
+            sent += len(results)
+            if session.done:
+                yield sse_event({"segments": sent}, event="done")
+                return
+            if not results:
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/save-recording/stream/<session_id>/finish", methods=["POST"])
+def finish_recording_stream(session_id):
+    """Flush the last utterance and wait for every segment, returning the same fields as /save-recording"""
+    session = recording_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired recording"}), 404
+    session.finish()
+    deadline = time.monotonic() + STREAM_FINISH_TIMEOUT
+    while not session.done and time.monotonic() < deadline:
+        session.wait(len(session.results), timeout=deadline - time.monotonic())
+    results = list(session.results)
+    return jsonify({
+        "recognized_text": " ".join(r["recognized_text"] for r in results if r.get("recognized_text")),
+        "translated": " ".join(r["translated"] for r in results if r.get("translated")),
+        "segments": results,
+        "complete": session.done,
+    })
+
+@app.route("/asr/stats")
+def asr_stats():
+    return jsonify(asr_router.stats())
+
 @app.route("/get-audio")
 def get_audio():
     text = request.args.get("text")
     lang = request.args.get("lang", "en")
+    slow = request.args.get("slow", "false").lower() == "true"
     if not text:
         return "Missing text", 400
+    chunks = split_sentences(text, TTS_CHUNK_MAX_CHARS)
+    if not chunks:
+        return "Missing text", 400
+    if len(chunks) > 1:
+        return stream_speech(text, chunks, lang, slow)
+    try:
+        # The chunk, not the raw text, so this hits what text_to_voice() cached for the same sentence.
+        path, key = audio_cache.get_or_create(chunks[0], lang, slow, synthesize_speech)
+        # The file name is the content hash, so it doubles as a strong ETag
+        # and repeat requests can be answered with 304 Not Modified.
+        return send_file(path, mimetype="audio/mpeg", as_attachment=False,
+                         conditional=True, etag=key, max_age=86400)
+    except Exception as e:
+        print(f"Error in text_to_voice: {e}")
+        return f"Error generating audio: {e}", 500
+
+def stream_speech(text, chunks, lang, slow):
+    """Stream the sentence chunks' MP3 frames in order while later chunks are still being synthesized"""
+    key = audio_cache.make_key(text, lang, slow)
+    # Weak: a chunk evicted and synthesized again may not be byte-identical.
+    if request.if_none_match.contains_weak(key):
+        response = Response(status=304)
+        response.set_etag(key, weak=True)
+        return response
+    body = stream_audio(chunks, lambda chunk: synthesize_chunk(chunk, lang, slow), tts_chunk_executor)
     try:
-        temp_path = text_to_voice(text, lang)
-        if not temp_path:
-            return "Error generating audio", 500
-        return send_file(temp_path, mimetype="audio/mpeg", as_attachment=False)
+        # Wait for the first sentence here, so a failure is still a 500 and not a cut-off stream.
+        first = next(body)
+    except StopIteration:
+        first = b""
     except Exception as e:
+        print(f"Error in text_to_voice: {e}")
         return f"Error generating audio: {e}", 500
+    response = Response(chain([first], body), mimetype="audio/mpeg")
+    response.set_etag(key, weak=True)
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return response
+
+@app.route("/get-audio/stats")
+def audio_cache_stats():
+    return jsonify(audio_cache.stats())
+
+# ========== Startup ==========
+WARM_UPS = {
+    "asr": lambda: sr.Recognizer,
+    "translate": translator_engine.get,
+    "tts": lambda: gtts.gTTS,
+    "gemini": model.get,
+    "pdf": pymupdf.get,
+    "report": get_layout,
+    "llm": lambda: analyzer.ConversationAnalyzer,
+}
+
+def warm_up(names=None):
+    """Load the named subsystems (all of them by default) ahead of the first request"""
+    for name in names or WARM_UPS:
+        try:
+            WARM_UPS[name]()
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+
+@app.route("/debug/startup")
+def startup_report():
+    """Startup time and how long each lazily loaded subsystem took to import or initialize"""
+    return jsonify({"startup_seconds": STARTUP_SECONDS, "loaded": load_report(),
+                    "subsystems": list(WARM_UPS)})
+
+@app.route("/debug/warmup", methods=["POST"])
+def warmup_route():
+    names = (request.get_json(silent=True) or {}).get("subsystems") or list(WARM_UPS)
+    unknown = [name for name in names if name not in WARM_UPS]
+    if unknown:
+        return jsonify({"error": f"Unknown subsystems: {', '.join(unknown)}"}), 400
+    warm_up(names)
+    return jsonify({"loaded": load_report()})
+
+if WARM_UP and not POOL_WORKER:
+    threading.Thread(target=warm_up, args=(None if WARM_UP == ["all"] else WARM_UP,), daemon=True).start()
+
+STARTUP_SECONDS = round(time.perf_counter() - STARTED, 3)
+print(f"App initialized in {STARTUP_SECONDS}s")
 
 # ========== Run Flask App ==========
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from lazy import LazyModule
+from process_pool import new_process_pool
+
+sr = LazyModule("speech_recognition")
+
+LOCAL_SAMPLE_RATE = 16000
+
+_local_pipelines = {}
+
+
+class ASRBackend(ABC):
+    """A speech-to-text engine. transcribe() returns "" when no speech was recognized
+    and raises when the engine itself fails."""
+
+    name = "base"
+
+    @abstractmethod
+    def transcribe(self, audio, language=None):
+        pass
+
+
+class GoogleASR(ASRBackend):
+    """The free Google Web Speech API, one network round trip per utterance"""
+
+    name = "google"
+
+    def transcribe(self, audio, language=None):
+        try:
+            if language:
+                return sr.Recognizer().recognize_google(audio, language=language)
+            return sr.Recognizer().recognize_google(audio)
+        except sr.UnknownValueError:
+            return ""
+
+
+def _local_transcribe(model_name, pcm, language):
+    """Process pool worker: run the Whisper pipeline on 16 kHz 16-bit mono PCM.
+
+    The pipeline is loaded once per worker process and reused.
+    """
+    import numpy as np
+    from transformers import pipeline
+
+    asr = _local_pipelines.get(model_name)
+    if asr is None:
+        asr = pipeline("automatic-speech-recognition", model=model_name, device="cpu")
+        _local_pipelines[model_name] = asr
+
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    kwargs = {"generate_kwargs": {"language": language, "task": "transcribe"}} if language else {}
+    result = asr({"raw": samples, "sampling_rate": LOCAL_SAMPLE_RATE}, **kwargs)
+    return result["text"].strip()
+
+
+class LocalASR(ASRBackend):
+    """Offline Whisper decoding on a CPU process pool sized to the cores.
+
+    The pool and the models are created on first use, so configuring this
+    backend costs nothing until traffic is routed to it.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name="openai/whisper-tiny", workers=None):
+        self.model_name = model_name
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = new_process_pool(self.workers)
+            return self._pool
+
+    def transcribe(self, audio, language=None):
+        pcm = audio.get_raw_data(convert_rate=LOCAL_SAMPLE_RATE, convert_width=2)
+        # Whisper wants a bare language code ("hi"), not a locale ("hi-IN").
+        language = language.split("-")[0] if language else None
+        return self.get_pool().submit(_local_transcribe, self.model_name, pcm, language).result()
+
+
+class ASRRouter:
+    """Sends each utterance to an ASR backend and keeps per-backend latency statistics.
+
+    mode is the name of a backend, or "auto" to pick the backend with the
+    lowest moving-average latency per second of audio. In auto mode every
+    explore_every-th call goes to another backend so its numbers stay
+    current, and a backend that fails falls through to the next one.
+    A pinned backend has no fallback.
+    """
+
+    def __init__(self, backends, mode="auto", explore_every=20, alpha=0.2):
+        self.backends = {backend.name: backend for backend in backends}
+        if mode != "auto" and mode not in self.backends:
+            raise ValueError(f"Unknown ASR backend: {mode}")
+        self.mode = mode
+        self.explore_every = explore_every
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._stats = {name: {"calls": 0, "errors": 0, "ewma_ms": None, "ewma_rtf": None}
+                       for name in self.backends}
+
+    def _order(self):
+        """Backends to try for the next call, best first"""
+        if self.mode != "auto":
+            return [self.mode]
+
+        with self._lock:
+            self._calls += 1
+            explore = self._calls % self.explore_every == 0
+            unmeasured = [name for name, s in self._stats.items() if s["calls"] == 0]
+            ranked = sorted((name for name, s in self._stats.items() if s["ewma_rtf"] is not None),
+                            key=lambda name: self._stats[name]["ewma_rtf"])
+            # Backends that have only ever failed go last.
+            failing = [name for name, s in self._stats.items() if s["calls"] and s["ewma_rtf"] is None]
+        if unmeasured:
+            return unmeasured[:1] + ranked + failing + unmeasured[1:]
+        if explore and len(ranked) > 1:
+            ranked = ranked[1:2] + ranked[:1] + ranked[2:]
+        return ranked + failing
+
+    def _record(self, name, seconds, audio_seconds, failed=False):
+        with self._lock:
+            stats = self._stats[name]
+            stats["calls"] += 1
+            if failed:
+                stats["errors"] += 1
+                return
+            rtf = seconds / max(audio_seconds, 0.1)
+            for key, value in (("ewma_ms", seconds * 1000), ("ewma_rtf", rtf)):
+                previous = stats[key]
+                stats[key] = value if previous is None else previous + self.alpha * (value - previous)
+
+    def transcribe(self, audio, language=None):
+        audio_seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        error = None
+        for name in self._order():
+            start = time.perf_counter()
+            try:
+                text = self.backends[name].transcribe(audio, language)
+            except Exception as e:
+                self._record(name, time.perf_counter() - start, audio_seconds, failed=True)
+                print(f"ASR backend {name} failed: {e}")
+                error = e
+                continue
+            self._record(name, time.perf_counter() - start, audio_seconds)
+            return text
+        raise error
+
+    def stats(self):
+        with self._lock:
+            backends = {}
+            for name, stats in self._stats.items():
+                backends[name] = dict(stats)
+                for key in ("ewma_ms", "ewma_rtf"):
+                    if backends[name][key] is not None:
+                        backends[name][key] = round(backends[name][key], 3)
+            return {"mode": self.mode, "backends": backends}
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from translation_cache import normalize_text
+
+SEPARATOR = "\n"
+TRANSLATION_ERROR = "[Translation error]"
+
+
+def pack_requests(texts, max_chars=4500, max_items=100):
+    """Group texts into newline-joined requests that stay under the backend's size limit"""
+    groups, current, size = [], [], 0
+    for text in texts:
+        if current and (size + len(text) + 1 > max_chars or len(current) >= max_items):
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text) + 1
+    if current:
+        groups.append(current)
+    return groups
+
+
+def translate_group(texts, src, dest, translate_one, translate_many=None):
+    """Translate a group of single-line texts in one round trip.
+
+    The texts are sent newline-joined as one request. If the backend merges
+    or splits lines, the group is retried with translate_many(texts, src, dest)
+    when given, and one call per text otherwise.
+    """
+    if len(texts) == 1:
+        return [translate_one(texts[0], src, dest)]
+    lines = translate_one(SEPARATOR.join(texts), src, dest).split(SEPARATOR)
+    if len(lines) == len(texts):
+        return [line.strip() for line in lines]
+    print(f"Batched translation returned {len(lines)} lines for {len(texts)} segments, retrying per segment")
+    if translate_many:
+        return translate_many(texts, src, dest)
+    return [translate_one(text, src, dest) for text in texts]
+
+
+def translate_batch(segments, targets, cache, translate_one, translate_many=None, src="auto",
+                    max_workers=4, max_chars=4500):
+    """Translate every segment into every target language with as few remote calls as possible.
+
+    Segments are de-duplicated on their normalized form and looked up in the
+    translation cache first. The misses for each target are packed into a
+    few large requests, and all (target, request) pairs run concurrently.
+    Returns ({target: [translation per segment]}, stats).
+    """
+    unique = {}
+    for segment in segments:
+        text = " ".join(segment.split())
+        if text:
+            unique.setdefault(normalize_text(text), text)
+
+    translated = {target: {} for target in targets}
+    work = []
+    for target in targets:
+        misses = []
+        for key, text in unique.items():
+            if target == src:
+                translated[target][key] = text
+                continue
+            hit = cache.get(text, src, target)
+            if hit is None:
+                misses.append(text)
+            else:
+                translated[target][key] = hit
+        work.extend((target, group) for group in pack_requests(misses, max_chars))
+
+    def run(item):
+        target, group = item
+        try:
+            results = translate_group(group, src, target, translate_one, translate_many)
+        except Exception as e:
+            print(f"Error in translate_batch ({target}): {e}")
+            return target, group, None
+        for text, result in zip(group, results):
+            cache.put(text, src, target, result)
+        return target, group, results
+
+    if work:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(work))) as executor:
+            for target, group, results in executor.map(run, work):
+                for i, text in enumerate(group):
+                    translated[target][normalize_text(text)] = results[i] if results else TRANSLATION_ERROR
+
+    output = {}
+    for target in targets:
+        output[target] = [translated[target].get(normalize_text(segment), "") if segment.strip() else ""
+                          for segment in segments]
+    stats = {
+        "segments": len(segments),
+        "unique": len(unique),
+        "targets": len(targets),
+        "remote_calls": len(work),
+    }
+    return output, stats
@@ -0,0 +1,132 @@
+import os
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from extraction import format_fields
+
+ALLOWED_EXTENSIONS = (".pdf", ".txt")
+INVALID_TYPE = "Invalid file type. Only PDF, TXT and ZIP allowed"
+# Raised while reading a damaged, truncated, encrypted or oddly compressed member.
+ZIP_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError)
+
+
+class BatchTooLarge(ValueError):
+    """The archives in a batch would expand to more than the allowed total"""
+
+
+def spool_batch(files, directory, max_files=500, max_file_bytes=20 * 1024 * 1024, max_total_bytes=None):
+    """Save uploaded files into directory, expanding .zip archives.
+
+    Returns one (filename, path, error) per file, in upload order and with
+    archive members where their archive was: path is set for a spooled
+    document and error for a skipped one. Files are written under generated
+    names, so archive paths can never escape the directory. Raises
+    BatchTooLarge before extracting an archive whose members would take the
+    uncompressed total past max_total_bytes. An archive that turns out to be
+    damaged is reported as a single error, without any of its members.
+    """
+    spooled = []
+    counts = {"documents": 0, "expanded_bytes": 0}
+
+    def reject(filename, error):
+        spooled.append((filename, None, error))
+
+    def add(filename, write):
+        if counts["documents"] >= max_files:
+            reject(filename, f"Batch limit of {max_files} files reached")
+            return
+        path = os.path.join(directory, f"{len(spooled):05d}{os.path.splitext(filename)[1].lower()}")
+        spooled.append((filename, path, None))
+        counts["documents"] += 1
+        write(path)
+
+    for uploaded in files:
+        name = uploaded.filename or ""
+        lower = name.lower()
+        if lower.endswith(".zip"):
+            zip_path = os.path.join(directory, f"upload-{len(spooled)}-{time.time_ns()}.zip")
+            uploaded.save(zip_path)
+            start = len(spooled)
+            try:
+                with zipfile.ZipFile(zip_path) as archive:
+                    members = [info for info in archive.infolist() if not info.is_dir()]
+                    # ZipExtFile stops at the declared file_size, so these sizes bound what gets written.
+                    counts["expanded_bytes"] += sum(info.file_size for info in members
+                                                    if info.filename.lower().endswith(ALLOWED_EXTENSIONS)
+                                                    and info.file_size <= max_file_bytes)
+                    if max_total_bytes and counts["expanded_bytes"] > max_total_bytes:
+                        raise BatchTooLarge(f"{name} expands past the {max_total_bytes // (1024 * 1024)} MB batch limit")
+                    for info in members:
+                        member = info.filename
+                        if not member.lower().endswith(ALLOWED_EXTENSIONS):
+                            reject(member, INVALID_TYPE)
+                        elif info.file_size > max_file_bytes:
+                            reject(member, "File too large")
+                        else:
+                            add(member, lambda path, info=info: _extract_member(archive, info, path))
+            except ZIP_ERRORS:
+                # Drop whatever this archive already queued; the whole archive is reported instead.
+                for _, path, _ in spooled[start:]:
+                    if path:
+                        counts["documents"] -= 1
+                        if os.path.exists(path):
+                            os.remove(path)
+                del spooled[start:]
+                reject(name, "Invalid zip archive")
+            finally:
+                os.remove(zip_path)
+        elif lower.endswith(ALLOWED_EXTENSIONS):
+            add(name, uploaded.save)
+        else:
+            reject(name, INVALID_TYPE)
+
+    return spooled
+
+
+def _extract_member(archive, info, path):
+    with archive.open(info) as src, open(path, "wb") as dst:
+        while True:
+            chunk = src.read(64 * 1024)
+            if not chunk:
+                break
+            dst.write(chunk)
+
+
+def run_batch(spooled, process_document, max_workers=8):
+    """Run process_document(filename, path) -> fields for every spooled document concurrently.
+
+    Takes spool_batch()'s list and returns one status dict per entry, in the
+    same order; skipped entries come back as errors without being run.
+    """
+    def run_one(entry):
+        filename, path, error = entry
+        if error:
+            return {"filename": filename, "status": "error", "error": error}
+        start = time.perf_counter()
+        try:
+            fields = process_document(filename, path)
+            return {"filename": filename, "status": "ok", "fields": fields,
+                    "seconds": round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            return {"filename": filename, "status": "error", "error": str(e),
+                    "seconds": round(time.perf_counter() - start, 3)}
+
+    documents = sum(1 for _, path, _ in spooled if path)
+    if not documents:
+        return [run_one(entry) for entry in spooled]
+    with ThreadPoolExecutor(max_workers=min(max_workers, documents)) as executor:
+        return list(executor.map(run_one, spooled))
+
+
+def combined_report(results):
+    """Plain-text report covering every successfully processed file"""
+    sections = []
+    for result in results:
+        if result["status"] == "ok":
+            sections.append(f"=== {result['filename']} ===\n{format_fields(result['fields'])}")
+        else:
+            sections.append(f"=== {result['filename']} ===\nError: {result['error']}")
+    return "\n\n".join(sections)
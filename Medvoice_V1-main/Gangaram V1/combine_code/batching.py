@@ -0,0 +1,104 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFullError(Exception):
+    """Raised when the batching queue already holds max_queue_size requests"""
+
+
+class BatchingWorker:
+    """Groups concurrent requests into batches and runs them on one background thread.
+
+    Requests are submitted with a key; only requests sharing the same key
+    (e.g. model name, max_length and temperature) end up in the same batch.
+    The worker waits at most ``max_wait_ms`` after the first request of a batch
+    for more requests to arrive, and never builds batches larger than
+    ``max_batch_size``.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=20, max_queue_size=64):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._last_batch_size = 0
+
+        self._thread = threading.Thread(target=self._run, name="batching-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, payload):
+        """Queue a request and return a Future resolved with its result"""
+        future = Future()
+        try:
+            self._queue.put_nowait((key, payload, future))
+        except queue.Full:
+            raise QueueFullError(f"Inference queue is full ({self.max_queue_size} requests waiting)")
+        return future
+
+    def run(self, key, payload, timeout=None):
+        """Submit a request and block until its result is available"""
+        return self.submit(key, payload).result(timeout=timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_queue_size": self.max_queue_size,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "requests": self._requests,
+                "last_batch_size": self._last_batch_size,
+                "avg_batch_size": self._requests / self._batches if self._batches else 0.0,
+            }
+
+    def _collect_batches(self):
+        first = self._queue.get()
+        groups = {first[0]: [first]}
+        deadline = time.monotonic() + self.max_wait
+
+        while len(groups[first[0]]) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            group = groups.setdefault(item[0], [])
+            group.append(item)
+            if len(group) >= self.max_batch_size:
+                break
+
+        return groups
+
+    def _run(self):
+        while True:
+            for key, batch in self._collect_batches().items():
+                self._run_batch(key, batch)
+
+    def _run_batch(self, key, batch):
+        futures = [future for _, _, future in batch]
+        payloads = [payload for _, payload, _ in batch]
+
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._last_batch_size = len(batch)
+
+        try:
+            results = self.process_batch(key, payloads)
+            for future, result in zip(futures, results):
+                future.set_result(result)
+        except Exception as e:
+            print(f"Error in batching worker: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
@@ -0,0 +1,105 @@
+"""Compare CPU inference modes: load time, weight and process memory, and generation tokens/second.
+
+Usage: python benchmarks/inference_modes.py [--model gpt2] [--modes fp32,int8,bf16] [--tokens 64] [--runs 3] [--threads 4]
+
+Each mode runs in a fresh process so memory numbers do not bleed into each other.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_CONVERSATION = """Doctor: Good morning, what brings you in today?
+Patient: I have had a headache and a mild fever for three days.
+Doctor: Any nausea or sensitivity to light?
+Patient: Some nausea in the mornings, no problem with light.
+Doctor: Take paracetamol 500 mg twice a day and come back on Monday if it persists."""
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(args):
+    import torch
+    from analyzer import ConversationAnalyzer
+
+    start = time.perf_counter()
+    analyzer = ConversationAnalyzer(args.model, inference_mode=args.child,
+                                    num_threads=args.threads, cache_dir=args.cache_dir)
+    load_seconds = time.perf_counter() - start
+
+    inputs = analyzer.tokenizer(analyzer.build_prompt(SAMPLE_CONVERSATION), return_tensors="pt")
+
+    def generate():
+        with torch.no_grad():
+            return analyzer.model.generate(**inputs, max_new_tokens=args.tokens, min_new_tokens=args.tokens,
+                                           do_sample=False, pad_token_id=analyzer.tokenizer.eos_token_id)
+
+    output = generate()
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        generate()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "mode": analyzer.inference_mode,
+        "requested_mode": args.child,
+        "load_seconds": round(load_seconds, 2),
+        "weights_mb": round(analyzer.memory_footprint() / (1024 * 1024), 1),
+        "rss_mb": round(rss_mb(), 1),
+        "tokens_per_second": round(args.tokens / min(timings), 1),
+        "first_tokens": output[0, inputs["input_ids"].shape[1]:][:8].tolist(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--modes", default="fp32,int8,bf16")
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--cache-dir", default=os.path.join(os.path.expanduser("~"), ".cache", "medvoice_models"))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args)))
+        return
+
+    results = []
+    for mode in args.modes.split(","):
+        command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--model", args.model,
+                   "--tokens", str(args.tokens), "--runs", str(args.runs), "--cache-dir", args.cache_dir]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{mode}: failed\n{completed.stderr[-2000:]}")
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    baseline = next((r for r in results if r["mode"] == "fp32"), None)
+    print(f"model={args.model} new_tokens={args.tokens} runs={args.runs} threads={args.threads or 'default'}")
+    print(f"{'mode':<6} {'load s':>7} {'weights MB':>11} {'RSS MB':>8} {'tokens/s':>9} {'speedup':>8}  same tokens as fp32")
+    for r in results:
+        speedup = r["tokens_per_second"] / baseline["tokens_per_second"] if baseline else 1.0
+        same = "-" if not baseline else ("yes" if r["first_tokens"] == baseline["first_tokens"] else "no")
+        label = r["mode"] if r["mode"] == r["requested_mode"] else f"{r['requested_mode']}->{r['mode']}"
+        print(f"{label:<6} {r['load_seconds']:>7} {r['weights_mb']:>11} {r['rss_mb']:>8} "
+              f"{r['tokens_per_second']:>9} {speedup:>7.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure the prefill time saved by reusing the cached prompt prefix.
+
+Usage: python benchmarks/prefix_cache.py [--model gpt2] [--runs 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from analyzer import ConversationAnalyzer
+
+SAMPLE_CONVERSATION = """Doctor: Good morning, what brings you in today?
+Patient: I have had a headache and a mild fever for three days.
+Doctor: Any nausea or sensitivity to light?
+Patient: Some nausea in the mornings, no problem with light.
+Doctor: Take paracetamol 500 mg twice a day and come back on Monday if it persists."""
+
+
+def time_prefill(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    analyzer = ConversationAnalyzer(args.model)
+    tokenizer, model = analyzer.tokenizer, analyzer.model
+
+    full_ids = tokenizer(analyzer.build_prompt(SAMPLE_CONVERSATION), return_tensors="pt")["input_ids"].to(analyzer.device)
+    tail_ids = tokenizer(analyzer.build_prompt_tail(SAMPLE_CONVERSATION), return_tensors="pt",
+                         add_special_tokens=False)["input_ids"].to(analyzer.device)
+    prefix_ids, prefix_past = analyzer.get_prefix_cache()
+
+    def full_prefill():
+        with torch.no_grad():
+            model(full_ids, use_cache=True)
+
+    def cached_prefill():
+        with torch.no_grad():
+            model(tail_ids,
+                  past_key_values=analyzer.copy_prefix_past(prefix_past, 1),
+                  attention_mask=torch.ones(1, prefix_ids.shape[1] + tail_ids.shape[1], dtype=torch.long, device=analyzer.device),
+                  use_cache=True)
+
+    full_prefill()
+    cached_prefill()
+    full_ms = time_prefill(full_prefill, args.runs)
+    cached_ms = time_prefill(cached_prefill, args.runs)
+
+    print(f"model={args.model} device={analyzer.device} runs={args.runs}")
+    print(f"prompt tokens: {full_ids.shape[1]} (prefix {prefix_ids.shape[1]}, conversation {tail_ids.shape[1]})")
+    print(f"full prefill:   {full_ms:8.2f} ms (median)")
+    print(f"cached prefill: {cached_ms:8.2f} ms (median)")
+    print(f"saved:          {full_ms - cached_ms:8.2f} ms ({(1 - cached_ms / full_ms) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Measure consultation summary PDF rendering throughput, serial and on the worker pool.
+
+Usage: python benchmarks/report_render.py [--reports 500] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_renderer import render_report, render_many, get_render_pool
+
+SAMPLE_FIELDS = {
+    "Patient Name": "Asha Verma",
+    "Age": "42",
+    "Symptoms": "headache, mild fever, nausea in the mornings",
+    "Diagnosis": "Viral fever",
+    "Prescribed Medication": "Paracetamol 500 mg twice a day",
+    "Follow-up Date": "Monday",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    batch = [dict(SAMPLE_FIELDS, **{"Patient Name": f"Patient {i}"}) for i in range(args.reports)]
+
+    render_report(SAMPLE_FIELDS)
+    start = time.perf_counter()
+    size = sum(len(render_report(fields)) for fields in batch)
+    serial = time.perf_counter() - start
+
+    # Start the workers before timing so process spawn is not counted.
+    list(get_render_pool(args.workers).map(render_report, [SAMPLE_FIELDS] * args.workers))
+    start = time.perf_counter()
+    render_many(batch, max_workers=args.workers)
+    pooled = time.perf_counter() - start
+
+    print(f"reports: {args.reports}, average size: {size // args.reports} bytes")
+    print(f"serial: {args.reports / serial:.0f} reports/s")
+    print(f"pool ({args.workers} workers): {args.reports / pooled:.0f} reports/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""Offline performance suite for the combined app: latency percentiles, throughput and peak memory per case.
+
+Usage:
+    python benchmarks/run.py                      # run everything, compare with benchmarks/baseline.json
+    python benchmarks/run.py --save-baseline      # run and record the results as the new baseline
+    python benchmarks/run.py --only history,pdf   # run the cases whose names contain any of these
+    python benchmarks/run.py --quick              # fewer runs and smaller inputs
+
+Google services are replaced by in-process stubs (GEMINI_STUB for Gemini,
+fake googletrans and gTTS modules) and the LLM cases use a tiny random GPT-2
+built on the fly, so results only reflect this code. Every case runs on
+synthetic inputs of increasing size. The exit status is 1 when any case is
+slower or uses more memory than the baseline by more than --threshold.
+
+Memory is reported twice: peak_kb is the Python heap peak from tracemalloc,
+which does not see torch, numpy or PyMuPDF buffers allocated in C, and
+rss_kb is the growth of the process's resident set over the same run,
+sampled every millisecond from /proc (Linux only), which does.
+
+benchmarks/baseline.json is committed as a reference. Timings are machine
+specific, so a CI job should record its own on the target branch first
+(--save-baseline --baseline base.json) and then compare the change against
+it (--baseline base.json).
+"""
+import argparse
+import atexit
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+WORDS = ("pain fever headache cough nausea since three days morning night tablet paracetamol "
+         "ibuprofen twice daily after food blood pressure sugar test report follow up monday "
+         "chest back stomach dizzy tired sleep water rest week better worse").split()
+
+
+# ========== Synthetic data ==========
+def synthetic_sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_transcript(turns, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(turns):
+        speaker = "Doctor" if i % 2 == 0 else "Patient"
+        if i == 1:
+            lines.append(f"{speaker}: My name is Asha, I am 42 years old. {synthetic_sentence(rng)}")
+        else:
+            lines.append(f"{speaker}: {synthetic_sentence(rng, rng.randint(6, 20))}")
+    return "\n".join(lines)
+
+
+def synthetic_pdf(pages, seed=0):
+    from fpdf import FPDF
+
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_font("Arial", size=11)
+    for _ in range(pages):
+        pdf.add_page()
+        for _ in range(30):
+            pdf.multi_cell(0, 6, txt=synthetic_sentence(rng, 14))
+    return pdf.output(dest="S").encode("latin-1")
+
+
+# ========== Offline stand-ins ==========
+def install_google_stubs():
+    """Replace googletrans and gTTS with instant local fakes"""
+    googletrans = types.ModuleType("googletrans")
+
+    class Translator:
+        def translate(self, text, dest="en", src="auto"):
+            if isinstance(text, list):
+                return [self.translate(t, dest, src) for t in text]
+            return types.SimpleNamespace(text=f"[{dest}] {text}", src="en", dest=dest)
+
+    googletrans.Translator = Translator
+    sys.modules["googletrans"] = googletrans
+
+    gtts = types.ModuleType("gtts")
+
+    class gTTS:
+        def __init__(self, text, lang="en", slow=False):
+            self.text = text
+
+        def save(self, path):
+            with open(path, "wb") as f:
+                f.write(b"\xff\xfb\x90\x00" * (len(self.text) + 16))
+
+    gtts.gTTS = gTTS
+    sys.modules["gtts"] = gtts
+
+
+def make_tiny_model(directory):
+    """Random 2-layer GPT-2 with a byte-level BPE tokenizer trained on synthetic transcripts"""
+    from tokenizers import ByteLevelBPETokenizer
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+    import torch
+
+    if os.path.exists(os.path.join(directory, "config.json")):
+        return directory
+    trainer = ByteLevelBPETokenizer()
+    trainer.train_from_iterator([synthetic_transcript(40, seed) for seed in range(20)],
+                                vocab_size=400, special_tokens=["<|endoftext|>"])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=trainer._tokenizer,
+                                        bos_token="<|endoftext|>", eos_token="<|endoftext|>")
+    torch.manual_seed(0)
+    config = GPT2Config(vocab_size=len(tokenizer), n_positions=512, n_embd=64, n_layer=2, n_head=2,
+                        bos_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id)
+    GPT2LMHeadModel(config).save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    return directory
+
+
+# ========== Measurement ==========
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return None
+
+
+class RSSSampler:
+    """Highest resident set size above the starting point while the block runs"""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.start = self.peak = rss_kb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_kb())
+
+    def __enter__(self):
+        if self.start is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self._done.set()
+            self._thread.join()
+            self.peak = max(self.peak, rss_kb())
+
+    def growth(self):
+        return None if self.start is None else self.peak - self.start
+
+
+def measure(fn, runs, warmup=1):
+    """Latency percentiles, throughput, Python heap peak and RSS growth for fn()"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    elapsed = time.perf_counter() - started
+
+    # A separate traced run, so tracemalloc overhead stays out of the timings.
+    tracemalloc.start()
+    with RSSSampler() as rss:
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "runs": runs,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "ops_per_second": round(runs / elapsed, 2),
+        "peak_kb": round(peak / 1024, 1),
+        "rss_kb": rss.growth(),
+    }
+
+
+# ========== Cases ==========
+def build_cases(appmod, model_dir, quick):
+    from werkzeug.datastructures import FileStorage
+    from report_renderer import render_report
+
+    scale = 0.25 if quick else 1
+    # name -> (fn, runs) or (fn, runs, setup)
+    cases = {}
+
+    analyzer = appmod.model_registry.get(model_dir)
+    for turns in (4, 40, 400):
+        transcript = synthetic_transcript(int(turns * scale) or 2)
+        cases[f"analyze_conversation/{turns}_turns"] = (
+            lambda transcript=transcript: analyzer.analyze_conversation(transcript, max_length=24, temperature=0.7),
+            3 if turns >= 400 else 10)
+
+    store = appmod.history_shards.get("benchmark")
+    rng = random.Random(1)
+
+    def grow_history(target):
+        # Runs right before its case, so the history has exactly this size while measured.
+        while store.last_id() < target:
+            store.append(rng.choice(("Doctor", "Patient")), synthetic_sentence(rng), synthetic_sentence(rng),
+                         source_lang="en", target_lang="hi")
+
+    for size in (100, 1000, 10000):
+        cases[f"read_conversation_history/{size}_entries"] = (
+            lambda: appmod.read_conversation_history(store), 50, lambda target=int(size * scale): grow_history(target))
+
+    for pages in (1, 20, 100):
+        data = synthetic_pdf(max(1, int(pages * scale)), seed=pages)
+        cases[f"extract_text/pdf_{pages}_pages"] = (
+            lambda data=data: appmod.extract_text(FileStorage(io.BytesIO(data), filename="report.pdf"),
+                                                  char_budget=appmod.GEMINI_MAX_INPUT_CHARS),
+            5 if pages >= 100 else 20)
+    for turns in (40, 4000):
+        data = synthetic_transcript(int(turns * scale) or 2).encode("utf-8")
+        cases[f"extract_text/txt_{turns}_turns"] = (
+            lambda data=data: appmod.extract_text(FileStorage(io.BytesIO(data), filename="notes.txt"),
+                                                  char_budget=appmod.GEMINI_MAX_INPUT_CHARS),
+            50)
+
+    fields = appmod.extract_fields_cached(synthetic_transcript(10))
+    cases["render_report/1_report"] = (lambda: render_report(fields), 200)
+
+    client = appmod.app.test_client()
+    counter = iter(range(10 ** 9))
+    for turns in (10, 400):
+        transcript = synthetic_transcript(int(turns * scale) or 2)
+
+        def upload(transcript=transcript):
+            # A unique trailer per call keeps the extraction cache from answering.
+            body = f"{transcript}\nDoctor: visit {next(counter)}".encode("utf-8")
+            response = client.post("/upload", data={"file": (io.BytesIO(body), "consult.txt")},
+                                   content_type="multipart/form-data")
+            assert response.status_code == 200, response.get_data(as_text=True)
+        cases[f"upload/{turns}_turns"] = (upload, 10)
+
+    for segments in (10, 1000):
+        texts = [synthetic_sentence(random.Random(i), 10) for i in range(int(segments * scale) or 2)]
+
+        def translate(texts=texts):
+            appmod.translation_cache._memory.clear()
+            appmod.translate_segments(texts, ["hi", "ta"])
+        cases[f"translate_segments/{segments}_segments"] = (translate, 10)
+
+    return cases
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        # RSS moves in allocator-sized steps, so it gets a much larger slack than the Python heap.
+        for key, limit_slack in (("p50_ms", min_delta_ms), ("p95_ms", min_delta_ms), ("peak_kb", 64),
+                                 ("rss_kb", 4096)):
+            if result.get(key) is None or before.get(key) is None:
+                continue
+            if result[key] > before[key] * (1 + threshold) and result[key] - before[key] > limit_slack:
+                regressions.append(f"{name}: {key} {before[key]} -> {result[key]} "
+                                   f"(+{(result[key] / before[key] - 1) * 100 if before[key] else 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--only", default="")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="medvoice_bench_")
+    atexit.register(shutil.rmtree, workdir, True)
+    model_dir = make_tiny_model(os.path.join(workdir, "tiny-gpt2"))
+    os.environ.update({
+        "GEMINI_STUB": "1",
+        "GEMINI_STUB_LATENCY": "0",
+        "GEMINI_RPM": "1000000",
+        "GEMINI_BURST": "1000000",
+        "AVAILABLE_MODELS": model_dir,
+        "HISTORY_DB": os.path.join(workdir, "history.db"),
+        "HISTORY_DIR": os.path.join(workdir, "history"),
+        "TRANSLATION_CACHE_DB": "",
+        "EXTRACTION_CACHE_DB": os.path.join(workdir, "extraction.db"),
+        "TTS_CACHE_DIR": os.path.join(workdir, "tts"),
+        "HISTORY_PAGE_SIZE": "200",
+    })
+    install_google_stubs()
+    os.chdir(workdir)  # keeps the legacy translated_output.txt import out of the way
+
+    import app as appmod
+
+    cases = build_cases(appmod, model_dir, args.quick)
+    filters = [f for f in args.only.split(",") if f]
+    results = {}
+    for name, (fn, runs, *setup) in cases.items():
+        if filters and not any(f in name for f in filters):
+            continue
+        for step in setup:
+            step()
+        results[name] = measure(fn, max(2, runs // 4) if args.quick else runs)
+        r = results[name]
+        print(f"{name:<42} p50 {r['p50_ms']:>9.2f} ms  p95 {r['p95_ms']:>9.2f} ms  "
+              f"{r['ops_per_second']:>9.2f} ops/s  peak {r['peak_kb']:>9.1f} KB  "
+              f"rss +{r['rss_kb'] if r['rss_kb'] is not None else '?':>7} KB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import re
+
+# A new speaker turn starts with "Doctor:", "Patient said:", "[timestamp] Doctor said:" etc.
+SPEAKER_TURN = re.compile(r"^\s*(?:\[[^\]]*\]\s*)?[A-Za-z][\w .'-]{0,30}?(?:\s+said)?\s*:")
+
+
+def split_turns(text):
+    """Split a transcript into speaker turns, keeping continuation lines with their turn"""
+    turns = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if turns and not SPEAKER_TURN.match(line):
+            turns[-1] += "\n" + line.strip()
+        else:
+            turns.append(line.strip())
+    return turns
+
+
+def split_oversized(turn, count_tokens, max_tokens):
+    """Break a single turn that is longer than max_tokens at word boundaries"""
+    pieces, words, size = [], [], 0
+    for word in turn.split():
+        word_tokens = count_tokens(" " + word)
+        if words and size + word_tokens > max_tokens:
+            pieces.append(" ".join(words))
+            words, size = [], 0
+        words.append(word)
+        size += word_tokens
+    if words:
+        pieces.append(" ".join(words))
+    return pieces
+
+
+def chunk_text(text, count_tokens, max_tokens):
+    """Greedily pack whole speaker turns into chunks of at most max_tokens.
+
+    count_tokens(text) -> int measures a piece of text (tokenizer length for
+    the local model, character count for Gemini).
+    """
+    chunks, current, size = [], [], 0
+    for turn in split_turns(text):
+        turn_tokens = count_tokens(turn)
+        pieces = [turn] if turn_tokens <= max_tokens else split_oversized(turn, count_tokens, max_tokens)
+        for piece in pieces:
+            piece_tokens = turn_tokens if piece is turn else count_tokens(piece)
+            # +1 for the newline that joins turns inside a chunk
+            if current and size + piece_tokens + 1 > max_tokens:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += piece_tokens + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
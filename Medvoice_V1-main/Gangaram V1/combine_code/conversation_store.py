@@ -0,0 +1,244 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    speaker TEXT NOT NULL,
+    source_text TEXT NOT NULL,
+    translated_text TEXT NOT NULL,
+    source_lang TEXT,
+    target_lang TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+SHARD_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+COLUMNS = ("id", "timestamp", "speaker", "source_text", "translated_text", "source_lang", "target_lang")
+
+
+class ConversationStore:
+    """Append-only conversation log backed by SQLite in WAL mode.
+
+    Appends are a single INSERT and reads walk the primary key index, so
+    neither gets slower as the history grows. Each thread gets its own
+    connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, speaker, source_text, translated_text, source_lang=None, target_lang=None, timestamp=None):
+        """Add one utterance and return its id"""
+        timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO entries (timestamp, speaker, source_text, translated_text, source_lang, target_lang) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (timestamp, speaker.lower(), source_text, translated_text, source_lang, target_lang),
+            )
+            return cursor.lastrowid
+
+    def tail(self, limit=200):
+        """Return the last `limit` entries, oldest first"""
+        rows = self._connect().execute(
+            "SELECT * FROM entries ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def entries_after(self, entry_id, limit=500, since=None, until=None, speakers=None):
+        """Up to limit entries with id > entry_id, optionally only those timestamped
+        within [since, until] ("YYYY-MM-DD HH:MM:SS" strings) and spoken by speakers"""
+        where, params = ["id > ?"], [entry_id]
+        if since:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            where.append("timestamp <= ?")
+            params.append(until)
+        if speakers:
+            where.append(f"speaker IN ({', '.join('?' * len(speakers))})")
+            params.extend(speaker.lower() for speaker in speakers)
+        rows = self._connect().execute(
+            f"SELECT * FROM entries WHERE {' AND '.join(where)} ORDER BY id LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_entries(self, batch_size=500, **filters):
+        """Yield every entry in order without loading the whole history; filters as for entries_after()"""
+        last_id = 0
+        while True:
+            batch = self.entries_after(last_id, batch_size, **filters)
+            if not batch:
+                return
+            yield from batch
+            last_id = batch[-1]["id"]
+
+    def last_id(self):
+        row = self._connect().execute("SELECT MAX(id) FROM entries").fetchone()
+        return row[0] or 0
+
+    def version(self):
+        """(generation, last_id), read together; the generation is bumped by every clear()"""
+        row = self._connect().execute(
+            "SELECT (SELECT value FROM meta WHERE key = 'generation'), (SELECT MAX(id) FROM entries)"
+        ).fetchone()
+        return int(row[0] or 0), row[1] or 0
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+
+    def import_legacy(self, legacy_path):
+        """Import a translated_output.txt history once; later calls are no-ops"""
+        key = "legacy_import:" + os.path.abspath(legacy_path)
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        if not os.path.exists(legacy_path):
+            return 0
+
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            rows = list(parse_legacy_lines(f))
+        with conn:
+            conn.executemany(
+                "INSERT INTO entries (timestamp, speaker, source_text, translated_text) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)",
+                         (key, datetime.now().strftime(TIMESTAMP_FORMAT)))
+        print(f"Imported {len(rows)} entries from {legacy_path}")
+        return len(rows)
+
+
+class EmptyStore:
+    """Stands in for a consultation that has no shard yet: reads find nothing and clear() has nothing to do"""
+
+    def tail(self, limit=200):
+        return []
+
+    def entries_after(self, entry_id, limit=500, since=None, until=None, speakers=None):
+        return []
+
+    def iter_entries(self, batch_size=500, **filters):
+        return iter(())
+
+    def last_id(self):
+        return 0
+
+    def version(self):
+        return 0, 0
+
+    def clear(self):
+        pass
+
+
+EMPTY_STORE = EmptyStore()
+
+
+class ConversationShards:
+    """One ConversationStore per consultation, each in its own SQLite file under directory.
+
+    Consultations never share a file, so their writers never contend on the
+    same lock and clearing one leaves the others untouched. Up to max_open
+    stores are kept open, least recently used first out. The shard named
+    "default" can be pointed at an existing history file with default_path.
+
+    A shard file is only created by get(create=True), i.e. for a write;
+    reads use create=False and get EMPTY_STORE until then, so clients that
+    only look never leave files behind.
+    """
+
+    def __init__(self, directory, default_path=None, max_open=256):
+        self.directory = directory
+        self.default_path = default_path
+        self.max_open = max_open
+        self._stores = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def is_valid_id(shard_id):
+        return bool(shard_id) and bool(SHARD_ID.match(shard_id))
+
+    def path_for(self, shard_id):
+        if shard_id == "default" and self.default_path:
+            return self.default_path
+        return os.path.join(self.directory, f"{shard_id}.db")
+
+    def get(self, shard_id, create=True):
+        if not self.is_valid_id(shard_id):
+            raise ValueError(f"Invalid consultation id: {shard_id!r}")
+        with self._lock:
+            store = self._stores.get(shard_id)
+            if store is not None:
+                self._stores.move_to_end(shard_id)
+                return store
+        if not create and not os.path.exists(self.path_for(shard_id)):
+            return EMPTY_STORE
+        # Opening creates the schema, so do it outside the lock.
+        store = ConversationStore(self.path_for(shard_id))
+        with self._lock:
+            store = self._stores.setdefault(shard_id, store)
+            self._stores.move_to_end(shard_id)
+            while len(self._stores) > self.max_open:
+                self._stores.popitem(last=False)
+        return store
+
+    def stats(self):
+        with self._lock:
+            open_shards = len(self._stores)
+        return {"open_shards": open_shards,
+                "shards": sum(1 for name in os.listdir(self.directory) if name.endswith(".db"))}
+
+
+def parse_legacy_lines(lines):
+    """Parse the two-line "[ts] Doctor said: ..." / "[ts] Translated: ..." text format"""
+    pending = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        timestamp, _, rest = line.partition("] ")
+        timestamp = timestamp.lstrip("[")
+        if " said: " in rest:
+            speaker, _, text = rest.partition(" said: ")
+            pending = (timestamp, speaker.strip().lower(), text)
+        elif rest.startswith("Translated: ") and pending:
+            yield (pending[0], pending[1], pending[2], rest[len("Translated: "):])
+            pending = None
+
+
+def format_legacy_entry(entry):
+    """Render an entry back into the two-line text format used by translated_output.txt"""
+    timestamp = f"[{entry['timestamp']}]"
+    return (f"{timestamp} {entry['speaker'].capitalize()} said: {entry['source_text']}\n"
+            f"{timestamp} Translated: {entry['translated_text']}\n")
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import re
+import stat
+import threading
+
+import torch
+from torch import nn
+from transformers.pytorch_utils import Conv1D
+
+INFERENCE_MODES = ("fp32", "int8", "bf16")
+
+_interop_configured = False
+_threads_lock = threading.Lock()
+
+
+def configure_threads(num_threads=None, interop_threads=None):
+    """Pin torch's intra-op (and, once per process, inter-op) thread counts"""
+    global _interop_configured
+    with _threads_lock:
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        if interop_threads and not _interop_configured:
+            _interop_configured = True
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError as e:
+                # Only allowed before the first parallel op runs.
+                print(f"Could not set inter-op threads: {e}")
+
+
+def bf16_supported():
+    """True when the CPU has native bf16 kernels (AVX512-BF16 or AMX); elsewhere bf16 is slower than fp32"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def convert_conv1d_to_linear(module):
+    """GPT-2 style models use transformers' Conv1D, which quantize_dynamic skips; swap in nn.Linear"""
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features)
+            linear.weight = nn.Parameter(child.weight.detach().t().contiguous())
+            linear.bias = nn.Parameter(child.bias.detach().clone())
+            setattr(module, name, linear)
+        else:
+            convert_conv1d_to_linear(child)
+    return module
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization: Linear weights stored as int8, activations quantized per batch"""
+    convert_conv1d_to_linear(model)
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def model_size_bytes(model):
+    """Bytes held by the model's tensors, including packed int8 weights that parameters() misses"""
+    total = 0
+    for value in model.state_dict().values():
+        tensors = value if isinstance(value, (tuple, list)) else (value,)
+        for tensor in tensors:
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def private_cache_dir(cache_dir):
+    """Create cache_dir with mode 0700; False unless it is ours and nobody else can write to it"""
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        info = os.stat(cache_dir)
+    except OSError as e:
+        print(f"Could not create model cache {cache_dir}: {e}")
+        return False
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        print(f"Not using model cache {cache_dir}: owned by another user")
+        return False
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        print(f"Not using model cache {cache_dir}: writable by other users")
+        return False
+    return True
+
+
+def cache_path(cache_dir, model_name, mode):
+    """One file per model, mode and library version, so an upgrade never loads incompatible weights"""
+    import transformers
+
+    source = model_name
+    if os.path.isdir(model_name):
+        # Local checkpoints: rebuild when the weights change.
+        source += "".join(f"{f}:{os.path.getmtime(os.path.join(model_name, f))}"
+                          for f in sorted(os.listdir(model_name)))
+    digest = hashlib.sha256(f"{source}|{mode}|{torch.__version__}|{transformers.__version__}".encode()).hexdigest()[:16]
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name.strip("/"))[-60:]
+    return os.path.join(cache_dir, f"{safe_name}-{mode}-{digest}.pt")
+
+
+def load_cpu_model(model_name, mode="fp32", cache_dir=None):
+    """Load a causal LM for CPU inference in the given mode.
+
+    int8 models are quantized once and their state_dict saved to cache_dir.
+    Later loads quantize an empty model built from the config and fill it
+    from the cache, instead of reading the fp32 checkpoint. The file is read
+    with weights_only=True, so it can hold tensors but never code.
+    """
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    if mode not in INFERENCE_MODES:
+        raise ValueError(f"Unknown inference mode: {mode}")
+    if mode == "bf16" and not bf16_supported():
+        print("bf16 is not supported natively on this CPU, falling back to fp32")
+        mode = "fp32"
+
+    if mode == "int8" and cache_dir and not private_cache_dir(cache_dir):
+        cache_dir = None
+    if mode == "int8" and cache_dir:
+        path = cache_path(cache_dir, model_name, mode)
+        if os.path.exists(path):
+            try:
+                model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(model_name)).eval()
+                model = quantize_int8(model)
+                model.load_state_dict(torch.load(path, weights_only=True))
+                return model, mode
+            except Exception as e:
+                print(f"Ignoring unreadable model cache {path}: {e}")
+
+    model = AutoModelForCausalLM.from_pretrained(model_name).eval()
+    if mode == "bf16":
+        model = model.to(torch.bfloat16)
+    elif mode == "int8":
+        model = quantize_int8(model)
+        if cache_dir:
+            try:
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                torch.save(model.state_dict(), tmp_path)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"Could not cache quantized model at {path}: {e}")
+    return model, mode
@@ -0,0 +1,106 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from chunking import chunk_text
+
+EXTRACTION_FIELDS = [
+    "Patient Name",
+    "Age",
+    "Symptoms",
+    "Diagnosis",
+    "Prescribed Medication",
+    "Follow-up Date",
+]
+
+# Fields that can hold several items; partial values from different chunks
+# are unioned instead of picking one.
+LIST_FIELDS = {"Symptoms", "Prescribed Medication"}
+
+EMPTY_VALUES = {"", "[value]", "n/a", "na", "none", "unknown", "not mentioned", "not specified", "not available"}
+
+EXTRACTION_PROMPT = """Analyze this doctor-patient conversation and extract the following information:
+        - Patient Name: [extract full name]
+        - Age: [extract age]
+        - Symptoms: [list all symptoms]
+        - Diagnosis: [medical condition]
+        - Prescribed Medication: [list medications]
+        - Follow-up Date: [extract date if mentioned]
+
+        Return the information in this exact format:
+        Patient Name: [value]
+        Age: [value]
+        Symptoms: [value]
+        Diagnosis: [value]
+        Prescribed Medication: [value]
+        Follow-up Date: [value]
+
+        Conversation:
+        """
+
+# Changes whenever the prompt or field list is edited, which invalidates cached extractions.
+PROMPT_VERSION = hashlib.sha256("\x1f".join([EXTRACTION_PROMPT] + EXTRACTION_FIELDS).encode("utf-8")).hexdigest()[:12]
+
+
+def is_empty(value):
+    return value.strip().strip(".").lower() in EMPTY_VALUES
+
+
+def parse_fields(extracted):
+    """Turn the model's "Field: value" lines into a dict keyed by EXTRACTION_FIELDS"""
+    fields = {}
+    for line in extracted.splitlines():
+        if ':' not in line:
+            continue
+        field, value = line.split(':', 1)
+        field = field.strip().lstrip("-*• ").strip("* ")
+        for known in EXTRACTION_FIELDS:
+            if field.lower() == known.lower():
+                fields[known] = value.strip()
+                break
+    return fields
+
+
+def merge_fields(partials):
+    """Reduce pass: combine the fields extracted from each chunk into one record"""
+    merged = {}
+    for field in EXTRACTION_FIELDS:
+        values = [p[field] for p in partials if field in p and not is_empty(p[field])]
+        if field in LIST_FIELDS:
+            items = []
+            for value in values:
+                for item in value.split(","):
+                    item = item.strip()
+                    if item and item.lower() not in (i.lower() for i in items):
+                        items.append(item)
+            merged[field] = ", ".join(items)
+        else:
+            merged[field] = values[0] if values else ""
+        if not merged[field]:
+            merged[field] = "Not mentioned"
+    return merged
+
+
+def format_fields(fields):
+    return "\n".join(f"{field}: {fields.get(field, '')}" for field in EXTRACTION_FIELDS)
+
+
+def extract_chunk(model, chunk):
+    response = model.generate_content(EXTRACTION_PROMPT + chunk)
+    if not response.text:
+        raise ValueError("Empty response from AI model")
+    return parse_fields(response.text)
+
+
+def extract_fields(model, text, chunk_chars=8000, max_chars=100000, max_workers=4):
+    """Map-reduce structured extraction over a transcript of any length.
+
+    The transcript (capped at max_chars) is split on speaker turns into
+    chunks of at most chunk_chars, each chunk is sent to Gemini in parallel,
+    and the per-chunk fields are merged with merge_fields().
+    """
+    chunks = chunk_text(text[:max_chars], len, chunk_chars)
+    if len(chunks) == 1:
+        return merge_fields([extract_chunk(model, chunks[0])])
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        partials = list(executor.map(lambda chunk: extract_chunk(model, chunk), chunks))
+    return merge_fields(partials)
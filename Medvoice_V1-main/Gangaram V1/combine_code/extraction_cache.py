@@ -0,0 +1,110 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def normalize_document(text):
+    """Collapse whitespace so re-exports of the same consultation with a different layout share a key"""
+    return " ".join(text.split())
+
+
+class ExtractionCache:
+    """Persistent cache of parsed Gemini extraction fields, keyed by document content.
+
+    The key is sha256(normalized text, prompt version, model name), so a
+    prompt or model change never returns stale fields. Entries older than
+    ttl_seconds are ignored, and the least recently used rows are dropped
+    beyond max_entries.
+    """
+
+    def __init__(self, path, prompt_version, model_name, ttl_seconds=30 * 24 * 3600, max_entries=10000):
+        self.path = path
+        self.prompt_version = prompt_version
+        self.model_name = model_name
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, prompt_version TEXT NOT NULL, model_name TEXT NOT NULL, "
+                "fields TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions (last_used)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def make_key(self, text):
+        digest = hashlib.sha256()
+        for part in (normalize_document(text), self.prompt_version, self.model_name):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x1f")
+        return digest.hexdigest()
+
+    def get(self, text):
+        key = self.make_key(text)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT fields, created FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (now, key))
+                with self._lock:
+                    self._counters["hits"] += 1
+                return json.loads(row[0])
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, text, fields):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, prompt_version, model_name, fields, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.make_key(text), self.prompt_version, self.model_name, json.dumps(fields), now, now),
+            )
+            count = conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute("DELETE FROM extractions WHERE key IN ("
+                             "SELECT key FROM extractions ORDER BY last_used LIMIT ?)",
+                             (count - self.max_entries,))
+
+    def get_or_extract(self, text, extract):
+        """Return cached fields for text, or call extract(text) and store the result"""
+        fields = self.get(text)
+        if fields is None:
+            fields = extract(text)
+            self.put(text, fields)
+        return fields
+
+    def invalidate(self, all_versions=False):
+        """Drop entries written for another prompt version or model (or every entry). Returns the row count."""
+        with self._connect() as conn:
+            if all_versions:
+                return conn.execute("DELETE FROM extractions").rowcount
+            return conn.execute("DELETE FROM extractions WHERE prompt_version != ? OR model_name != ?",
+                                (self.prompt_version, self.model_name)).rowcount
+
+    def clear(self):
+        """Drop the entries of the current prompt version and model only. Returns the row count."""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM extractions WHERE prompt_version = ? AND model_name = ?",
+                                (self.prompt_version, self.model_name)).rowcount
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["entries"] = self._connect().execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        stats["prompt_version"] = self.prompt_version
+        return stats
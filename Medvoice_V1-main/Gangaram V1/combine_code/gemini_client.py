@@ -0,0 +1,107 @@
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import metrics
+
+
+class GeminiConfigError(ValueError):
+    """Gemini is not configured (e.g. no API key); retrying cannot help"""
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedClient:
+    """Wraps a Gemini model with a concurrency cap, a token-bucket rate limit and retries.
+
+    It exposes the same generate_content() as the model, so it can be passed
+    anywhere a model is expected.
+    """
+
+    def __init__(self, model, requests_per_minute=60, burst=5, max_concurrency=8, max_retries=3, backoff_seconds=1.0):
+        self.model = model
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff_seconds
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "retries": 0, "failures": 0}
+
+    def generate_content(self, prompt):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._semaphore:
+                try:
+                    with self._lock:
+                        self._counters["calls"] += 1
+                    with metrics.span("gemini_call"):
+                        return self.model.generate_content(prompt)
+                except GeminiConfigError:
+                    with self._lock:
+                        self._counters["failures"] += 1
+                    raise
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        with self._lock:
+                            self._counters["failures"] += 1
+                        raise
+                    delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                    print(f"Gemini call failed ({e}), retrying in {delay:.1f}s")
+                    with self._lock:
+                        self._counters["retries"] += 1
+            time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+class StubGeminiModel:
+    """Offline stand-in for genai.GenerativeModel used for load tests and local development.
+
+    It sleeps for `latency` seconds and answers in the extraction format with
+    values picked out of the conversation by simple patterns.
+    """
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        conversation = prompt.split("Conversation:")[-1]
+        name = re.search(r"(?:my name is|naam)\s+([A-Z][a-z]+)", conversation, re.IGNORECASE)
+        age = re.search(r"(\d{1,3})\s*(?:years? old|yrs)", conversation, re.IGNORECASE)
+        medication = re.findall(r"\b([A-Z][a-z]+(?:ol|in|ine|cin))\b", conversation)
+        text = "\n".join([
+            f"Patient Name: {name.group(1) if name else 'Not mentioned'}",
+            f"Age: {age.group(1) if age else 'Not mentioned'}",
+            "Symptoms: " + (", ".join(s for s in ("pain", "fever", "headache", "cough", "nausea")
+                                      if s in conversation.lower()) or "Not mentioned"),
+            "Diagnosis: Not mentioned",
+            f"Prescribed Medication: {', '.join(dict.fromkeys(medication)) or 'Not mentioned'}",
+            "Follow-up Date: Not mentioned",
+        ])
+        return SimpleNamespace(text=text)
@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+import textwrap
+from array import array
+from datetime import datetime
+from itertools import islice
+
+from conversation_store import COLUMNS, TIMESTAMP_FORMAT, format_legacy_entry
+
+CHUNK_BYTES = 64 * 1024
+
+# A4 in points, Helvetica 10pt: about 95 characters fit between the margins.
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+PDF_MARGIN = 50
+PDF_FONT_SIZE = 10
+PDF_LEADING = 14
+PDF_WRAP = 95
+PDF_LINES_PER_PAGE = (PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING - 2  # room for the page number
+PDF_FIRST_OBJECT = 4  # 1 catalog, 2 page tree, 3 font; then a content stream and a page per page
+
+
+def parse_timestamp(value, end_of_day=False):
+    """Normalize "YYYY-MM-DD", "YYYY-MM-DDTHH:MM" or "YYYY-MM-DD HH:MM:SS" to the store's format.
+
+    A bare date covers the whole day when end_of_day is set, so ?to=2024-05-01
+    includes that day. Raises ValueError for anything else.
+    """
+    value = value.strip().replace("T", " ")
+    for fmt in (TIMESTAMP_FORMAT, "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y-%m-%d" and end_of_day:
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return parsed.strftime(TIMESTAMP_FORMAT)
+    raise ValueError(f"Invalid date: {value!r}")
+
+
+def export_text(entries):
+    for entry in entries:
+        yield format_legacy_entry(entry)
+
+
+def export_jsonl(entries):
+    for entry in entries:
+        yield json.dumps({column: entry.get(column) for column in COLUMNS}, ensure_ascii=False) + "\n"
+
+
+def export_csv(entries):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for entry in entries:
+        writer.writerow([entry.get(column) for column in COLUMNS])
+        # Hand over each row as it is written, so the buffer never holds more than one.
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _pdf_text(text):
+    # The built-in Helvetica only covers WinAnsi; other scripts show up as '?', as in report_renderer.
+    encoded = text.encode("cp1252", "replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _pdf_lines(entries, title):
+    yield title
+    yield ""
+    for entry in entries:
+        said = f"[{entry['timestamp']}] {entry['speaker'].capitalize()} said: {entry['source_text']}"
+        yield from textwrap.wrap(said, PDF_WRAP) or [""]
+        yield from textwrap.wrap(f"Translated: {entry['translated_text']}", PDF_WRAP,
+                                 initial_indent="    ", subsequent_indent="    ") or [""]
+        yield ""
+
+
+def _page_stream(lines, number):
+    top = PAGE_HEIGHT - PDF_MARGIN
+    parts = [b"BT /F1 %d Tf %d TL %d %d Td" % (PDF_FONT_SIZE, PDF_LEADING, PDF_MARGIN, top)]
+    for line in lines:
+        parts.append(b"(" + _pdf_text(line) + b") Tj T*")
+    parts.append(b"ET")
+    parts.append(b"BT /F1 8 Tf %d %d Td (Page %d) Tj ET" % (PAGE_WIDTH // 2 - 15, PDF_MARGIN // 2, number))
+    return b"\n".join(parts)
+
+
+class _PDFWriter:
+    """Tracks byte offsets of objects as they are streamed out, for the closing xref table.
+
+    Object numbers below PDF_FIRST_OBJECT may be written in any order; the
+    rest must come in sequence. Offsets are packed 8 bytes each.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = array("Q", [0] * (PDF_FIRST_OBJECT - 1))
+
+    def raw(self, data):
+        self.position += len(data)
+        return data
+
+    def obj(self, number, body):
+        if number < PDF_FIRST_OBJECT:
+            self.offsets[number - 1] = self.position
+        else:
+            self.offsets.append(self.position)
+        return self.raw(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def trailer(self):
+        """The xref table and trailer, in pieces of 1000 entries"""
+        count = len(self.offsets) + 1
+        xref_position = self.position
+        yield b"xref\n0 %d\n0000000000 65535 f \n" % count
+        for start in range(0, len(self.offsets), 1000):
+            yield b"".join(b"%010d 00000 n \n" % offset for offset in self.offsets[start:start + 1000])
+        yield b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (count, xref_position)
+
+
+def export_pdf(entries, title="Conversation History"):
+    """A paginated A4 transcript, written page by page.
+
+    fpdf builds the whole document in memory before output, so this writes
+    the PDF objects directly: each page goes out as soon as it is full and
+    only the object offsets are kept for the xref table at the end.
+    """
+    writer = _PDFWriter()
+    yield writer.raw(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    yield writer.obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    lines = _pdf_lines(entries, title)
+    pages = 0
+    while True:
+        page_lines = list(islice(lines, PDF_LINES_PER_PAGE))
+        if not page_lines:
+            break
+        pages += 1
+        content_id = PDF_FIRST_OBJECT + 2 * (pages - 1)
+        stream = _page_stream(page_lines, pages)
+        yield writer.obj(content_id, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        yield writer.obj(content_id + 1,
+                         b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                         b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                         % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+
+    yield writer.obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    # The page tree is the only part that grows with the page count; stream it out in pieces.
+    writer.offsets[1] = writer.position
+    yield writer.raw(b"2 0 obj\n<< /Type /Pages /Count %d /Kids [" % pages)
+    for start in range(0, pages, 1000):
+        yield writer.raw(b"".join(b"%d 0 R " % (PDF_FIRST_OBJECT + 2 * i + 1)
+                                  for i in range(start, min(pages, start + 1000))))
+    yield writer.raw(b"] >>\nendobj\n")
+    yield from writer.trailer()
+
+
+# format (also the file extension) -> (exporter, mimetype)
+EXPORT_FORMATS = {
+    "txt": (export_text, "text/plain; charset=utf-8"),
+    "jsonl": (export_jsonl, "application/x-ndjson; charset=utf-8"),
+    "csv": (export_csv, "text/csv; charset=utf-8"),
+    "pdf": (export_pdf, "application/pdf"),
+}
+
+
+def buffered(chunks, size=CHUNK_BYTES):
+    """Join small str/bytes chunks into blocks of about size bytes, one chunked-encoding frame each"""
+    pending, pending_bytes = [], 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        pending.append(chunk)
+        pending_bytes += len(chunk)
+        if pending_bytes >= size:
+            yield b"".join(pending)
+            pending, pending_bytes = [], 0
+    if pending:
+        yield b"".join(pending)
@@ -0,0 +1,60 @@
+import importlib
+import threading
+import time
+
+_timings = {}
+_timings_lock = threading.Lock()
+
+
+class LazyObject:
+    """Proxy that builds its target with factory() on first attribute access.
+
+    The first successful build is timed and recorded under name, see
+    load_report(). A factory that raises is retried on the next access, so
+    a missing credential only fails the requests that need it.
+    """
+
+    def __init__(self, factory, name):
+        self._factory = factory
+        self._name = name
+        self._target = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                if self._target is None:
+                    start = time.perf_counter()
+                    self._target = self._factory()
+                    record_timing(self._name, time.perf_counter() - start)
+                target = self._target
+        return target
+
+    @property
+    def loaded(self):
+        return self._target is not None
+
+    def __getattr__(self, attr):
+        # Only called for attributes the proxy itself does not have.
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+class LazyModule(LazyObject):
+    """A module imported on first attribute access: sr = LazyModule("speech_recognition")"""
+
+    def __init__(self, module_name):
+        super().__init__(lambda: importlib.import_module(module_name), module_name)
+
+
+def record_timing(name, seconds):
+    with _timings_lock:
+        _timings[name] = {"seconds": round(seconds, 4), "loaded_at": time.time()}
+
+
+def load_report():
+    """{name: {"seconds", "loaded_at"}} for every lazy subsystem loaded so far, slowest first"""
+    with _timings_lock:
+        return dict(sorted(_timings.items(), key=lambda item: -item[1]["seconds"]))
@@ -0,0 +1,179 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_metrics = []
+_registry_lock = threading.Lock()
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _metrics.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(v)}" for key, v in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter read at scrape time from fn() -> number, or {label value: number} for label_name"""
+
+    def __init__(self, name, help_text, fn, kind="gauge", label_name=None):
+        super().__init__(name, help_text)
+        self.kind = kind
+        self.fn = fn
+        self.label_name = label_name
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {e}")
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_format_labels([(self.label_name, label)])} {_format_value(v or 0)}"
+                    for label, v in sorted(value.items())]
+        return [f"{self.name} {_format_value(value or 0)}"]
+
+
+STAGE_SECONDS = Histogram("medvoice_stage_seconds", "Time spent in each processing stage")
+STAGE_ERRORS = Counter("medvoice_stage_errors_total", "Stages that raised")
+
+
+@contextmanager
+def span(stage):
+    """Time a block as one observation of medvoice_stage_seconds{stage=...}.
+
+    The duration is also added to the current request's timings when
+    per-request timing is enabled on this thread (see start_request()).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def record(stage, seconds):
+    """Add an already measured duration, e.g. an LLM prefill timed inside generate()"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+def start_request():
+    """Begin collecting span timings for the request on this thread"""
+    _request_timings.set([])
+
+
+def end_request():
+    """Stop collecting and return the (stage, seconds) pairs recorded since start_request()"""
+    timings = _request_timings.get() or []
+    _request_timings.set(None)
+    return timings
+
+
+def server_timing_header(timings, total=None):
+    """Format timings as a Server-Timing header, merging repeated stages"""
+    merged = {}
+    for stage, seconds in timings:
+        count, total_seconds = merged.get(stage, (0, 0.0))
+        merged[stage] = (count + 1, total_seconds + seconds)
+    parts = [f'{stage};dur={seconds * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+             for stage, (count, seconds) in merged.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ModelRegistry:
+    """Keeps a warm pool of loaded models and evicts the least recently used one.
+
+    ``loader(name)`` builds a model and ``size_fn(model)`` reports its size in
+    bytes. The pool holds at most ``max_models`` entries and, when
+    ``memory_budget_mb`` is set, at most that many megabytes. Each model has
+    its own load lock, so a slow ``from_pretrained`` only blocks requests for
+    that same model.
+    """
+
+    def __init__(self, loader, max_models=2, memory_budget_mb=None, size_fn=None):
+        self.loader = loader
+        self.max_models = max_models
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+        self.size_fn = size_fn or (lambda model: 0)
+
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._evictions = 0
+        self._load_seconds = 0.0
+
+    def get(self, name):
+        """Return the model called ``name``, loading it on first use"""
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                self._hits += 1
+                return self._models[name][0]
+            self._misses += 1
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            # Another request may have finished loading it while we waited.
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name][0]
+
+            start = time.perf_counter()
+            try:
+                model = self.loader(name)
+            except Exception:
+                with self._lock:
+                    self._load_locks.pop(name, None)
+                raise
+            size = self.size_fn(model)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._models[name] = (model, size)
+                self._loads += 1
+                self._load_seconds += elapsed
+                self._evict()
+            print(f"Loaded model {name} in {elapsed:.1f}s ({size / (1024 * 1024):.0f} MB)")
+            return model
+
+    def prewarm(self, names, background=True):
+        """Load ``names`` ahead of the first request, optionally on a background thread"""
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Error pre-warming model {name}: {e}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def evict(self, name):
+        with self._lock:
+            if self._models.pop(name, None) is not None:
+                self._evictions += 1
+                self._drop_load_lock(name)
+
+    def loaded_models(self):
+        with self._lock:
+            return list(self._models)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": list(self._models),
+                "max_models": self.max_models,
+                "memory_budget_mb": self.memory_budget / (1024 * 1024) if self.memory_budget else None,
+                "memory_used_mb": self._total_size() / (1024 * 1024),
+                "hits": self._hits,
+                "misses": self._misses,
+                "loads": self._loads,
+                "evictions": self._evictions,
+                "load_seconds": self._load_seconds,
+            }
+
+    def _drop_load_lock(self, name):
+        # Keep a lock someone is loading under; otherwise it would only pile up with every name ever seen.
+        load_lock = self._load_locks.get(name)
+        if load_lock is not None and not load_lock.locked():
+            del self._load_locks[name]
+
+    def _total_size(self):
+        return sum(size for _, size in self._models.values())
+
+    def _evict(self):
+        # Never evict the most recently used entry, even if it alone is over budget.
+        while len(self._models) > 1 and (
+            len(self._models) > self.max_models
+            or (self.memory_budget and self._total_size() > self.memory_budget)
+        ):
+            name, _ = self._models.popitem(last=False)
+            self._evictions += 1
+            self._drop_load_lock(name)
+            print(f"Evicted model {name} from the warm pool")
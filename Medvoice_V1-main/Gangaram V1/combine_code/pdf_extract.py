@@ -0,0 +1,159 @@
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from lazy import LazyModule
+from process_pool import new_process_pool
+
+pymupdf = LazyModule("pymupdf")
+
+READ_CHUNK_BYTES = 64 * 1024
+
+_process_pool = None
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def get_process_pool(max_workers=None):
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = new_process_pool(max_workers or os.cpu_count())
+    return _process_pool
+
+
+def spool_upload(stream, max_bytes, spool_threshold):
+    """Copy an upload stream into memory, or onto disk once it passes spool_threshold.
+
+    Returns ("memory", bytes) or ("disk", path). The caller removes the path.
+    Raises UploadTooLarge as soon as more than max_bytes have been read.
+    """
+    buffer = bytearray()
+    disk_file = None
+    total = 0
+    try:
+        while True:
+            chunk = stream.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+            if disk_file is None and total > spool_threshold:
+                disk_file = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+                disk_file.write(buffer)
+                buffer = None
+            if disk_file is not None:
+                disk_file.write(chunk)
+            else:
+                buffer.extend(chunk)
+    except Exception:
+        if disk_file is not None:
+            disk_file.close()
+            os.remove(disk_file.name)
+        raise
+
+    if disk_file is None:
+        return "memory", bytes(buffer)
+    disk_file.close()
+    return "disk", disk_file.name
+
+
+def _extract_page_range(path, start, end):
+    """Process pool worker: text of pages [start, end) of the PDF at path"""
+    with pymupdf.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, end)]
+
+
+def _join_within_budget(pages, char_budget):
+    text = "\n".join(pages)
+    return text[:char_budget] if char_budget else text
+
+
+def extract_pages_sequential(doc, char_budget=None):
+    pages, size = [], 0
+    for page in doc:
+        pages.append(page.get_text())
+        size += len(pages[-1]) + 1
+        if char_budget and size >= char_budget:
+            break
+    return _join_within_budget(pages, char_budget)
+
+
+def extract_pages_parallel(path, page_count, char_budget=None, pages_per_task=4, max_workers=None):
+    """Extract page ranges on the process pool, in order, until char_budget is reached.
+
+    At most max_workers ranges are in flight, so pages far past the budget
+    are never submitted.
+    """
+    pool = get_process_pool()
+    max_workers = max_workers or os.cpu_count() or 1
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+    results = {}
+    in_flight = {}
+    next_range = 0
+    next_to_emit = 0
+    pages, size = [], 0
+
+    while next_to_emit < len(ranges):
+        while next_range < len(ranges) and len(in_flight) < max_workers:
+            start, end = ranges[next_range]
+            in_flight[pool.submit(_extract_page_range, path, start, end)] = next_range
+            next_range += 1
+
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[in_flight.pop(future)] = future.result()
+
+        while next_to_emit in results:
+            for page_text in results.pop(next_to_emit):
+                pages.append(page_text)
+                size += len(page_text) + 1
+            next_to_emit += 1
+            if char_budget and size >= char_budget:
+                for future in in_flight:
+                    future.cancel()
+                return _join_within_budget(pages, char_budget)
+
+    return _join_within_budget(pages, char_budget)
+
+
+def extract_pdf_text(stream, char_budget=None, max_bytes=20 * 1024 * 1024,
+                     spool_threshold=2 * 1024 * 1024, parallel_min_pages=16, pages_per_task=4):
+    """Extract text from a PDF upload stream with bounded memory.
+
+    Small files are parsed in memory on the calling thread. Files larger than
+    spool_threshold are spooled to disk and, when they have at least
+    parallel_min_pages pages, extracted page-parallel on a process pool.
+    Both paths stop once char_budget characters have been collected.
+    """
+    kind, source = spool_upload(stream, max_bytes, spool_threshold)
+    if kind == "memory":
+        with pymupdf.open(stream=source, filetype="pdf") as doc:
+            return extract_pages_sequential(doc, char_budget)
+
+    try:
+        with pymupdf.open(source) as doc:
+            page_count = doc.page_count
+            if page_count < parallel_min_pages:
+                return extract_pages_sequential(doc, char_budget)
+        return extract_pages_parallel(source, page_count, char_budget, pages_per_task)
+    finally:
+        os.remove(source)
+
+
+def extract_plain_text(stream, char_budget=None, max_bytes=20 * 1024 * 1024):
+    """Read a UTF-8 text upload, stopping after char_budget characters"""
+    # A character is at most 4 UTF-8 bytes, so this many bytes always covers the budget.
+    limit = min(max_bytes, char_budget * 4) if char_budget else max_bytes
+    data = stream.read(limit + 1)
+    if len(data) <= limit:
+        text = data.decode("utf-8")
+    elif char_budget:
+        # Cut mid-file: only the last, possibly split, character may be invalid.
+        text = data[:limit].decode("utf-8", errors="ignore")
+    else:
+        raise UploadTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+    return text[:char_budget] if char_budget else text
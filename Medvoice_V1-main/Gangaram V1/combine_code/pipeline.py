@@ -0,0 +1,92 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobPipeline:
+    """Runs submitted jobs through a fixed sequence of stages, each on its own worker pool.
+
+    stages is a list of (name, fn, workers). Every fn takes the job context
+    dict and returns the updated context, or None to finish the job early.
+    Since each stage has its own pool, stages of different jobs overlap:
+    one utterance can be translated while the next is still being recognized.
+    """
+
+    def __init__(self, stages, max_jobs=1000):
+        self.stages = [(name, fn, ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-stage"))
+                       for name, fn, workers in stages]
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, context):
+        """Queue a job and return its id immediately"""
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "stage": None,
+            "created": time.time(),
+            "finished": None,
+            "timings": {},
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self._schedule(job, 0, dict(context))
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _schedule(self, job, index, context):
+        _, _, executor = self.stages[index]
+        executor.submit(self._run_stage, job, index, context)
+
+    def _run_stage(self, job, index, context):
+        name, fn, _ = self.stages[index]
+        with self._lock:
+            job["status"] = "running"
+            job["stage"] = name
+
+        start = time.perf_counter()
+        try:
+            result = fn(context)
+        except Exception as e:
+            print(f"Error in {name} stage: {e}")
+            with self._lock:
+                job["timings"][name] = time.perf_counter() - start
+                job["status"] = "failed"
+                job["error"] = str(e)
+                job["finished"] = time.time()
+            return
+
+        with self._lock:
+            job["timings"][name] = time.perf_counter() - start
+            if result is None or index + 1 == len(self.stages):
+                job["status"] = "done"
+                job["result"] = result if result is not None else context
+                job["finished"] = time.time()
+                return
+            job["status"] = "queued"
+        self._schedule(job, index + 1, result)
+
+    def stats(self):
+        """Job counts by status, plus the jobs not yet finished"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        counts["active"] = counts.get("queued", 0) + counts.get("running", 0)
+        return counts
+
+    def shutdown(self, wait=True):
+        for _, _, executor in self.stages:
+            executor.shutdown(wait=wait)
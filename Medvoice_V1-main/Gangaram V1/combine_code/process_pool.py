@@ -0,0 +1,27 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Modules whose functions run in pool workers; the fork server imports them once, up front.
+WORKER_MODULES = ["asr", "pdf_extract", "report_renderer"]
+
+
+def pool_context():
+    """A start method that is safe from a multithreaded server.
+
+    Pools are created lazily, after Flask's threads and possibly torch's
+    OpenMP threads exist, and forking such a process can deadlock the child.
+    The fork server is started fresh and forks workers from its own
+    single-threaded process; spawn is the fallback where it is missing.
+    Either way a worker imports the main script again as "__mp_main__"
+    when the server was started with "python app.py".
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # Instead of the default ["__main__"], which would rerun app startup in the server.
+        context.set_forkserver_preload(WORKER_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def new_process_pool(max_workers, initializer=None):
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=pool_context(), initializer=initializer)
@@ -0,0 +1,75 @@
+import os
+
+from extraction import EXTRACTION_FIELDS
+from lazy import LazyModule
+from process_pool import new_process_pool
+
+fpdf = LazyModule("fpdf")
+
+REPORT_TITLE = "Medical Consultation Summary"
+FONT = "Arial"
+FONT_SIZE = 12
+LINE_HEIGHT = 10
+MIN_LABEL_WIDTH = 50
+
+_layout = None
+_render_pool = None
+
+
+def to_latin1(text):
+    """The core PDF fonts only cover latin-1; anything else becomes '?' instead of failing the render"""
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+
+def get_layout():
+    """Label strings and column width, measured once per process"""
+    global _layout
+    if _layout is None:
+        measure = fpdf.FPDF()
+        measure.set_font(FONT, "B", FONT_SIZE)
+        labels = [(field, to_latin1(f"{field}:")) for field in EXTRACTION_FIELDS]
+        widest = max(measure.get_string_width(label) for _, label in labels)
+        _layout = {
+            "labels": labels,
+            "label_width": max(MIN_LABEL_WIDTH, widest + 4),
+            "title": to_latin1(REPORT_TITLE),
+        }
+    return _layout
+
+
+def render_report(fields):
+    """Render extracted fields into a consultation summary PDF and return its bytes"""
+    layout = get_layout()
+    pdf = fpdf.FPDF()
+    pdf.add_page()
+    pdf.set_font(FONT, size=FONT_SIZE)
+    pdf.cell(200, LINE_HEIGHT, txt=layout["title"], ln=1, align="C")
+    pdf.ln(10)
+
+    for field, label in layout["labels"]:
+        pdf.set_font(FONT, "B", FONT_SIZE)
+        pdf.cell(layout["label_width"], LINE_HEIGHT, txt=label, ln=0)
+        pdf.set_font(FONT, "", FONT_SIZE)
+        pdf.multi_cell(0, LINE_HEIGHT, txt=to_latin1(str(fields.get(field, "")).strip()))
+        pdf.ln(5)
+
+    # dest="S" builds the document in memory; pyfpdf returns it as a latin-1 str.
+    output = pdf.output(dest="S")
+    return output.encode("latin-1") if isinstance(output, str) else bytes(output)
+
+
+def get_render_pool(max_workers=None):
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = new_process_pool(max_workers or os.cpu_count(), initializer=get_layout)
+    return _render_pool
+
+
+def render_many(fields_list, max_workers=None):
+    """Render one PDF per fields dict on the worker pool; results keep input order"""
+    workers = max_workers or os.cpu_count() or 1
+    if len(fields_list) < 2 or workers < 2:
+        return [render_report(fields) for fields in fields_list]
+    # Large chunks keep the pickling round trips from outweighing the ~1 ms render.
+    chunksize = max(1, len(fields_list) // (workers * 4))
+    return list(get_render_pool(max_workers).map(render_report, fields_list, chunksize=chunksize))
@@ -0,0 +1,131 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from vad import EnergyVAD
+
+
+class RecordingSession:
+    """One chunked recording: VAD splits the incoming PCM and every utterance is processed as soon as it ends.
+
+    process_segment(pcm) -> dict runs on the shared executor, so utterance N
+    is recognized and translated while later audio is still arriving.
+    Results are published strictly in utterance order, and on_result is
+    called for each of them in that order.
+    """
+
+    def __init__(self, session_id, vad, process_segment, executor, on_result=None):
+        self.id = session_id
+        self.vad = vad
+        self.process_segment = process_segment
+        self.executor = executor
+        self.on_result = on_result
+        self.results = []
+        self.closed = False
+        self.updated = time.time()
+        self._ready = {}
+        self._submitted = 0
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.closed and len(self.results) == self._submitted
+
+    @property
+    def pending(self):
+        return self._submitted - len(self.results)
+
+    def feed(self, pcm):
+        with self._cond:
+            if self.closed:
+                raise ValueError("Recording already finished")
+            self.updated = time.time()
+            segments = self.vad.feed(pcm)
+            for segment in segments:
+                self._submit(segment)
+
+    def finish(self):
+        with self._cond:
+            if not self.closed:
+                for segment in self.vad.flush():
+                    self._submit(segment)
+                self.closed = True
+                self.updated = time.time()
+                self._cond.notify_all()
+
+    def wait(self, after=0, timeout=None):
+        """Block until there are results past index `after` or the session is done"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.results) > after or self.done, timeout)
+            return self.results[after:]
+
+    def _submit(self, segment):
+        start, pcm = segment
+        index = self._submitted
+        self._submitted += 1
+        self.executor.submit(self._run, index, start, pcm)
+
+    def _run(self, index, start, pcm):
+        began = time.perf_counter()
+        try:
+            result = self.process_segment(pcm)
+        except Exception as e:
+            print(f"Error processing segment {index} of recording {self.id}: {e}")
+            result = {"error": str(e)}
+        result.update({"index": index, "start": round(start, 2),
+                       "seconds": round(time.perf_counter() - began, 3)})
+
+        with self._cond:
+            self._ready[index] = result
+            while len(self.results) in self._ready:
+                ready = self._ready.pop(len(self.results))
+                self.results.append(ready)
+                if self.on_result:
+                    try:
+                        self.on_result(ready)
+                    except Exception as e:
+                        print(f"Error in on_result for recording {self.id}: {e}")
+            self.updated = time.time()
+            self._cond.notify_all()
+
+
+class SessionManager:
+    """Owns the live recording sessions and the worker pool their utterances run on.
+
+    Sessions idle for longer than idle_timeout are dropped, and the oldest
+    ones are evicted past max_sessions.
+    """
+
+    def __init__(self, workers=4, max_sessions=100, idle_timeout=600, vad_options=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stream-asr")
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.vad_options = vad_options or {}
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, process_segment, on_result=None, sample_rate=16000):
+        vad = EnergyVAD(sample_rate=sample_rate, **self.vad_options)
+        session = RecordingSession(uuid.uuid4().hex, vad, process_segment, self.executor, on_result)
+        with self._lock:
+            self._expire()
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def _expire(self):
+        cutoff = time.time() - self.idle_timeout
+        for session_id in [sid for sid, s in self._sessions.items() if s.updated < cutoff]:
+            del self._sessions[session_id]
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions),
+                    "pending_segments": sum(s.pending for s in self._sessions.values())}
@@ -0,0 +1,75 @@
+import io
+import os
+import zipfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from batch_upload import INVALID_TYPE, BatchTooLarge, run_batch, spool_batch
+
+
+def upload(name, data):
+    return FileStorage(io.BytesIO(data), filename=name)
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def corrupt_member(data, name):
+    """Flip bytes in the compressed data that follows name's local header"""
+    data = bytearray(data)
+    start = data.find(name.encode()) + len(name) + 10
+    for i in range(start, start + 20):
+        data[i] ^= 0xFF
+    return bytes(data)
+
+
+def test_results_keep_upload_order(tmp_path):
+    files = [upload("a.txt", b"a"),
+             upload("notes.zip", zip_bytes([("x.txt", b"x"), ("photo.png", b"p"), ("y.pdf", b"y")])),
+             upload("run.exe", b"?"),
+             upload("b.txt", b"b")]
+    spooled = spool_batch(files, str(tmp_path))
+
+    assert [(name, error) for name, _, error in spooled] == [
+        ("a.txt", None), ("x.txt", None), ("photo.png", INVALID_TYPE),
+        ("y.pdf", None), ("run.exe", INVALID_TYPE), ("b.txt", None)]
+    results = run_batch(spooled, lambda filename, path: open(path, "rb").read().decode())
+    assert [r["status"] for r in results] == ["ok", "ok", "error", "ok", "error", "ok"]
+    assert [r["fields"] for r in results if r["status"] == "ok"] == ["a", "x", "y", "b"]
+
+
+def test_max_files(tmp_path):
+    spooled = spool_batch([upload(f"{i}.txt", b"x") for i in range(3)], str(tmp_path), max_files=2)
+    assert [error for _, _, error in spooled] == [None, None, "Batch limit of 2 files reached"]
+
+
+def test_oversized_members_are_rejected(tmp_path):
+    files = [upload("docs.zip", zip_bytes([("big.txt", b"x" * 200), ("small.txt", b"x")]))]
+    spooled = spool_batch(files, str(tmp_path), max_file_bytes=100)
+    assert [(name, error) for name, _, error in spooled] == [("big.txt", "File too large"), ("small.txt", None)]
+
+
+def test_archives_past_the_total_are_refused_before_extracting(tmp_path):
+    files = [upload("bomb.zip", zip_bytes([("a.txt", b"0" * 4000), ("b.txt", b"0" * 4000)]))]
+    with pytest.raises(BatchTooLarge):
+        spool_batch(files, str(tmp_path), max_total_bytes=5000)
+    assert os.listdir(tmp_path) == []
+
+
+def test_damaged_archive_leaves_nothing_queued(tmp_path):
+    data = corrupt_member(zip_bytes([("m1.txt", b"m" * 5000), ("m2.txt", os.urandom(5000))]), "m2.txt")
+    spooled = spool_batch([upload("broken.zip", data), upload("b.txt", b"b")], str(tmp_path))
+
+    assert [(name, error) for name, _, error in spooled] == [("broken.zip", "Invalid zip archive"), ("b.txt", None)]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(spooled[1][1])]
+
+
+def test_not_a_zip(tmp_path):
+    spooled = spool_batch([upload("fake.zip", b"not a zip")], str(tmp_path))
+    assert spooled == [("fake.zip", None, "Invalid zip archive")]
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from batching import BatchingWorker, QueueFullError
+
+
+def test_results_go_back_to_their_requests():
+    batches = []
+
+    def process(key, payloads):
+        batches.append((key, list(payloads)))
+        return [f"{payload_key}:{i}" for payload_key, i in payloads]
+
+    worker = BatchingWorker(process, max_batch_size=8, max_wait_ms=50)
+    futures = [(key, i, worker.submit(key, (key, i))) for i in range(6) for key in ("a", "b")]
+
+    for key, i, future in futures:
+        assert future.result(timeout=5) == f"{key}:{i}"
+    # Requests with different keys never share a batch.
+    assert all(payload_key == key for key, payloads in batches for payload_key, _ in payloads)
+    assert sorted(i for key, payloads in batches if key == "a" for _, i in payloads) == list(range(6))
+
+
+def test_batches_respect_max_batch_size():
+    sizes = []
+    release = threading.Event()
+
+    def process(key, payloads):
+        release.wait(5)
+        sizes.append(len(payloads))
+        return payloads
+
+    worker = BatchingWorker(process, max_batch_size=3, max_wait_ms=50)
+    futures = [worker.submit("k", i) for i in range(7)]
+    release.set()
+    assert [future.result(timeout=5) for future in futures] == list(range(7))
+    assert max(sizes) <= 3
+
+
+def test_a_failed_batch_fails_each_request():
+    def process(key, payloads):
+        raise RuntimeError("model crashed")
+
+    worker = BatchingWorker(process, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        worker.run("k", "text", timeout=5)
+
+
+def test_full_queue_is_refused():
+    release = threading.Event()
+
+    def process(key, payloads):
+        release.wait(5)
+        return payloads
+
+    worker = BatchingWorker(process, max_batch_size=1, max_wait_ms=1, max_queue_size=1)
+    first = worker.submit("k", 1)
+    # Once the worker is busy with the first request, the queue holds exactly one more.
+    for _ in range(100):
+        if worker.stats()["queue_depth"] == 0:
+            break
+        threading.Event().wait(0.01)
+    worker.submit("k", 2)
+    with pytest.raises(QueueFullError):
+        worker.submit("k", 3)
+    release.set()
+    assert first.result(timeout=5) == 1
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from translation_cache import TranslationCache
+from tts_cache import AudioCache
+
+
+def test_translation_keys_ignore_case_and_spacing():
+    cache = TranslationCache()
+    cache.put("Take  the tablet\n", "auto", "hi", "dawa lo")
+    assert cache.get("take the TABLET", "auto", "hi") == "dawa lo"
+    assert cache.get("take the tablet", "auto", "ta") is None
+    assert cache.get("take the tablet", "en", "hi") is None
+
+
+def test_translation_entries_expire_and_evict():
+    cache = TranslationCache(max_entries=2, ttl_seconds=60)
+    cache.put("old", "auto", "hi", "x", created=1)
+    assert cache.get("old", "auto", "hi") is None
+
+    for text in ("a", "b", "c"):
+        cache.put(text, "auto", "hi", text.upper())
+    assert cache.get("a", "auto", "hi") is None
+    assert cache.get("c", "auto", "hi") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_translation_disk_tier_outlives_the_process_cache(tmp_path):
+    path = str(tmp_path / "translations.db")
+    TranslationCache(disk_path=path).put("fever", "auto", "hi", "bukhar")
+
+    cache = TranslationCache(disk_path=path)
+    assert cache.get("Fever", "auto", "hi") == "bukhar"
+    assert cache.get("fever", "auto", "hi") == "bukhar"
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+
+
+def test_get_or_translate_caches_only_successes():
+    cache = TranslationCache()
+    calls = []
+
+    def translate(text, src, dest):
+        calls.append(text)
+        if text == "bad":
+            raise RuntimeError("offline")
+        return text.upper()
+
+    assert cache.get_or_translate("ok", "auto", "hi", translate) == "OK"
+    assert cache.get_or_translate("ok", "auto", "hi", translate) == "OK"
+    with pytest.raises(RuntimeError):
+        cache.get_or_translate("bad", "auto", "hi", translate)
+    assert calls == ["ok", "bad"]
+
+
+def test_audio_keys_depend_on_text_language_and_speed():
+    key = AudioCache.make_key("hello", "en")
+    assert key == AudioCache.make_key("hello", "en", slow=False)
+    assert len({key, AudioCache.make_key("hello", "hi"), AudioCache.make_key("hello", "en", slow=True),
+                AudioCache.make_key("hello.", "en")}) == 4
+
+
+def test_audio_is_synthesized_once_per_key(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    calls = []
+
+    def synthesize(text, lang, slow, path):
+        calls.append(text)
+        with open(path, "wb") as f:
+            f.write(b"mp3")
+
+    path, key = cache.get_or_create("hello", "en", False, synthesize)
+    assert cache.get_or_create("hello", "en", False, synthesize) == (path, key)
+    assert os.path.basename(path) == f"{key}.mp3"
+    assert calls == ["hello"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_audio_evicts_past_max_bytes(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+
+    def synthesize(text, lang, slow, path):
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+
+    paths = [cache.get_or_create(text, "en", False, synthesize)[0] for text in ("a", "b", "c")]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 200
+    assert os.path.exists(paths[-1])
@@ -0,0 +1,41 @@
+from chunking import chunk_text, split_turns
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_continuation_lines_stay_with_their_turn():
+    text = ("Doctor: How long have you had it?\n"
+            "Patient said: Three days.\n"
+            "It gets worse at night.\n"
+            "\n"
+            "[2024-05-01 10:00:00] Doctor said: Any fever?")
+    assert split_turns(text) == [
+        "Doctor: How long have you had it?",
+        "Patient said: Three days.\nIt gets worse at night.",
+        "[2024-05-01 10:00:00] Doctor said: Any fever?",
+    ]
+
+
+def test_chunks_hold_whole_turns():
+    turns = [f"Doctor: {'word ' * 3}end" if i % 2 == 0 else f"Patient: {'word ' * 3}end" for i in range(6)]
+    chunks = chunk_text("\n".join(turns), count_words, max_tokens=12)
+
+    assert "\n".join(chunks) == "\n".join(turns)
+    for chunk in chunks:
+        assert all(line in turns for line in chunk.split("\n"))
+        assert count_words(chunk) + chunk.count("\n") + 1 <= 12
+
+
+def test_oversized_turn_is_split_at_word_boundaries():
+    turn = "Patient: " + " ".join(f"w{i}" for i in range(25))
+    chunks = chunk_text(turn, count_words, max_tokens=10)
+
+    assert len(chunks) > 1
+    assert " ".join(chunks).split() == turn.split()
+    assert all(count_words(chunk) <= 10 for chunk in chunks)
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text("\n\n", count_words, max_tokens=10) == []
@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from conversation_store import EMPTY_STORE, ConversationShards, ConversationStore, format_legacy_entry
+
+
+def test_entries_after_returns_only_the_delta(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.db"))
+    first = store.append("Doctor", "hello", "namaste")
+    store.append("Patient", "fever", "bukhar")
+    third = store.append("Doctor", "rest", "aaram")
+
+    delta = store.entries_after(first)
+    assert [entry["source_text"] for entry in delta] == ["fever", "rest"]
+    assert store.entries_after(third) == []
+    assert [entry["id"] for entry in store.entries_after(0, limit=2)] == [1, 2]
+    assert store.version() == (0, third)
+
+
+def test_entries_after_filters_by_speaker_and_time(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.db"))
+    store.append("Doctor", "a", "a", timestamp="2024-05-01 09:00:00")
+    store.append("Patient", "b", "b", timestamp="2024-05-01 10:00:00")
+    store.append("Doctor", "c", "c", timestamp="2024-05-02 09:00:00")
+
+    assert [e["source_text"] for e in store.iter_entries(speakers=["Doctor"])] == ["a", "c"]
+    assert [e["source_text"] for e in store.iter_entries(since="2024-05-01 09:30:00",
+                                                         until="2024-05-01 23:59:59")] == ["b"]
+
+
+def test_clear_bumps_the_generation(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.db"))
+    store.append("Doctor", "hello", "namaste")
+    store.clear()
+    assert store.tail() == []
+    assert store.version() == (1, 0)
+    store.clear()
+    assert store.version()[0] == 2
+
+
+def test_iter_entries_walks_every_batch(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.db"))
+    for i in range(25):
+        store.append("Doctor", str(i), str(i))
+    assert [e["source_text"] for e in store.iter_entries(batch_size=7)] == [str(i) for i in range(25)]
+
+
+def test_import_legacy_runs_once(tmp_path):
+    legacy = tmp_path / "translated_output.txt"
+    entry = {"timestamp": "2024-05-01 09:00:00", "speaker": "doctor",
+             "source_text": "hello", "translated_text": "namaste"}
+    legacy.write_text(format_legacy_entry(entry) + format_legacy_entry(dict(entry, speaker="patient")),
+                      encoding="utf-8")
+    store = ConversationStore(str(tmp_path / "history.db"))
+
+    assert store.import_legacy(str(legacy)) == 2
+    assert store.import_legacy(str(legacy)) == 0
+    rows = store.tail()
+    assert [(row["speaker"], row["source_text"], row["translated_text"]) for row in rows] == [
+        ("doctor", "hello", "namaste"), ("patient", "hello", "namaste")]
+    assert rows[0]["timestamp"] == "2024-05-01 09:00:00"
+
+
+def test_shards_are_separate_and_created_on_write(tmp_path):
+    shards = ConversationShards(str(tmp_path / "shards"))
+
+    assert shards.get("reader", create=False) is EMPTY_STORE
+    assert shards.get("reader", create=False).version() == (0, 0)
+    assert not os.path.exists(shards.path_for("reader"))
+
+    shards.get("one").append("Doctor", "hello", "namaste")
+    assert [e["source_text"] for e in shards.get("one", create=False).tail()] == ["hello"]
+    assert shards.get("two", create=False).tail() == []
+    assert shards.stats()["shards"] == 1
+
+
+def test_default_shard_uses_default_path(tmp_path):
+    default_path = str(tmp_path / "legacy.db")
+    shards = ConversationShards(str(tmp_path / "shards"), default_path=default_path)
+    shards.get("default").append("Doctor", "hello", "namaste")
+    assert ConversationStore(default_path).last_id() == 1
+
+
+def test_invalid_shard_ids_are_rejected(tmp_path):
+    shards = ConversationShards(str(tmp_path / "shards"))
+    for shard_id in ("", "../escape", "a" * 65, None):
+        with pytest.raises(ValueError):
+            shards.get(shard_id)
+
+
+def test_least_recently_used_shards_are_closed(tmp_path):
+    shards = ConversationShards(str(tmp_path / "shards"), max_open=2)
+    first = shards.get("a")
+    shards.get("b")
+    shards.get("c")
+    assert shards.stats()["open_shards"] == 2
+    assert shards.get("a") is not first
@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Cache key form of an utterance: NFC, collapsed whitespace, case-folded"""
+    return " ".join(unicodedata.normalize("NFC", text).split()).casefold()
+
+
+class TranslationCache:
+    """Two-tier translation cache: an in-process LRU in front of an optional SQLite file.
+
+    Entries are keyed by (normalized text, source language, target language)
+    and expire after ttl_seconds. The disk tier survives restarts and is
+    shared by every worker pointing at the same file.
+    """
+
+    def __init__(self, max_entries=5000, ttl_seconds=7 * 24 * 3600, disk_path=None, disk_max_entries=100000):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if disk_path:
+            with self._disk() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS translations ("
+                    "key TEXT PRIMARY KEY, translated TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+
+    def _disk(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.disk_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(text, src, dest):
+        return f"{src or 'auto'}\x1f{dest}\x1f{normalize_text(text)}"
+
+    def get(self, text, src, dest):
+        key = self.make_key(text, src, dest)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                translated, created = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return translated
+                del self._memory[key]
+
+        if self.disk_path:
+            with self._disk() as conn:
+                row = conn.execute("SELECT translated, created FROM translations WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] <= self.ttl:
+                    conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (now, key))
+                    with self._lock:
+                        self._counters["disk_hits"] += 1
+                    self._remember(key, row[0], row[1])
+                    return row[0]
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, text, src, dest, translated, created=None):
+        key = self.make_key(text, src, dest)
+        created = created or time.time()
+        self._remember(key, translated, created)
+
+        if self.disk_path:
+            with self._disk() as conn:
+                conn.execute("INSERT OR REPLACE INTO translations (key, translated, created, last_used) VALUES (?, ?, ?, ?)",
+                             (key, translated, created, created))
+                count = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                if count > self.disk_max_entries:
+                    conn.execute("DELETE FROM translations WHERE key IN ("
+                                 "SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                                 (count - self.disk_max_entries,))
+
+    def get_or_translate(self, text, src, dest, translate_fn):
+        """Return the cached translation or call translate_fn(text, src, dest) and cache it.
+
+        Exceptions from translate_fn propagate and nothing is cached.
+        """
+        translated = self.get(text, src, dest)
+        if translated is None:
+            translated = translate_fn(text, src, dest)
+            self.put(text, src, dest, translated)
+        return translated
+
+    def warm(self, entries):
+        """Pre-load (text, src, dest, translated) tuples, e.g. from the conversation history"""
+        count = 0
+        for text, src, dest, translated in entries:
+            if text and translated and dest:
+                self._remember(self.make_key(text, src, dest), translated, time.time())
+                count += 1
+        return count
+
+    def _remember(self, key, translated, created):
+        with self._lock:
+            self._memory[key] = (translated, created)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        if self.disk_path:
+            stats["disk_entries"] = self._disk().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return stats
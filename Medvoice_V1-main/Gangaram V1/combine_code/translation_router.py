@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+
+
+def base_language(code):
+    """"zh-CN" -> "zh", so detector codes compare equal to the app's language codes"""
+    return code.split("-")[0].lower() if code else None
+
+
+class TranslationRouter:
+    """Routes one utterance to every listener language.
+
+    The source language is detected once per session (e.g. consultation and
+    speaker) and reused for later utterances. Targets in the source language
+    are passed through untouched, with no translation and no speech; the
+    rest are translated together in one translate() call, then spoken
+    concurrently on executor.
+
+    detect(text) -> (code, confidence), translate(text, codes) -> {code: text}
+    and speak(text, code) -> anything are supplied by the caller.
+    """
+
+    def __init__(self, detect, translate, speak, executor, min_confidence=0.5, min_chars=12,
+                 max_sessions=1024):
+        self.detect = detect
+        self.translate_fn = translate
+        self.speak_fn = speak
+        self.executor = executor
+        self.min_confidence = min_confidence
+        self.min_chars = min_chars
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"detections": 0, "detection_hits": 0, "translated": 0, "skipped": 0, "spoken": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def source_language(self, session_key, text, hint=None):
+        """The session's source language, detecting it from text the first time.
+
+        Detections on short text or with low confidence fall back to hint
+        and are not cached, so a later, longer utterance gets another try.
+        A detection is cached with the hint it was made under; when the hint
+        changes (the speaker picked another language) it is detected again.
+        """
+        hint = base_language(hint)
+        with self._lock:
+            cached = self._sessions.get(session_key)
+            if cached and cached[0] == hint:
+                self._sessions.move_to_end(session_key)
+                self._counters["detection_hits"] += 1
+                return cached[1]
+        if len(text.strip()) < self.min_chars:
+            return hint
+
+        self._count("detections")
+        try:
+            code, confidence = self.detect(text)
+        except Exception as e:
+            print(f"Error detecting language: {e}")
+            return hint
+        if not isinstance(code, str) or (confidence or 0) < self.min_confidence:
+            return hint
+
+        code = base_language(code)
+        with self._lock:
+            self._sessions[session_key] = (hint, code)
+            self._sessions.move_to_end(session_key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return code
+
+    def forget(self, session_key):
+        with self._lock:
+            self._sessions.pop(session_key, None)
+
+    def translate(self, text, source, targets):
+        """{target: {"text", "skipped"}} for each distinct target; the ones not skipped in a single call"""
+        outputs = {}
+        pending = []
+        for target in dict.fromkeys(targets):
+            if source and base_language(target) == source:
+                outputs[target] = {"text": text, "skipped": True}
+            else:
+                pending.append(target)
+        self._count("skipped", len(outputs))
+        self._count("translated", len(pending))
+        if pending:
+            for target, translated in self.translate_fn(text, pending).items():
+                outputs[target] = {"text": translated, "skipped": False}
+        return {target: outputs[target] for target in dict.fromkeys(targets)}
+
+    def speak(self, outputs):
+        """Speak every translated (not skipped) output concurrently; returns {target: speak() result}"""
+        futures = {target: self.executor.submit(self.speak_fn, output["text"], target)
+                   for target, output in outputs.items() if not output["skipped"]}
+        self._count("spoken", len(futures))
+        return {target: future.result() for target, future in futures.items()}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["sessions"] = len(self._sessions)
+        return stats
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+
+
+class AudioCache:
+    """Content-addressed, size-capped cache of synthesized MP3 files.
+
+    Files are named by hash(text, lang, slow), so identical requests map to
+    the same file. The least recently used files are deleted once the
+    directory grows past max_bytes. Concurrent requests for the same key
+    share one in-flight synthesis.
+    """
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._counters = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0}
+        self._total_bytes = sum(os.path.getsize(path) for path, _ in self._files())
+
+    @staticmethod
+    def make_key(text, lang, slow=False):
+        return hashlib.sha256(f"{lang}\x1f{int(bool(slow))}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get_or_create(self, text, lang, slow, synthesize):
+        """Return (path, key) for the audio, calling synthesize(text, lang, slow, path) on a miss"""
+        key = self.make_key(text, lang, slow)
+        path = self.path_for(key)
+
+        with self._lock:
+            if os.path.exists(path):
+                self._counters["hits"] += 1
+                self._touch(path)
+                return path, key
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self._counters["misses"] += 1
+            else:
+                self._counters["shared"] += 1
+
+        if not owner:
+            return future.result(), key
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            os.close(fd)
+            try:
+                synthesize(text, lang, slow, tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            with self._lock:
+                self._total_bytes += os.path.getsize(path)
+                self._evict(keep=path)
+            future.set_result(path)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return path, key
+
+    def _files(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".mp3"):
+                path = os.path.join(self.directory, name)
+                try:
+                    yield path, os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self, keep):
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Oldest modification time first; hits refresh mtime via _touch().
+        for path, stat in sorted(self._files(), key=lambda item: item[1].st_mtime):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._total_bytes -= stat.st_size
+            self._counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["bytes"] = self._total_bytes
+            stats["max_bytes"] = self.max_bytes
+            stats["in_flight"] = len(self._in_flight)
+        return stats
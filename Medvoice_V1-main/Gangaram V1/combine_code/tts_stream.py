@@ -0,0 +1,64 @@
+import re
+
+READ_BLOCK = 64 * 1024
+
+# Sentence ends in Latin, Devanagari and other Indic scripts (danda), CJK and Arabic punctuation.
+SENTENCE_END = re.compile(r"(?<=[.!?।॥。！？؟])\s+|(?<=[।॥。！？])")
+
+
+def split_sentences(text, max_chars=200, min_chars=20):
+    """Split text into sentence chunks for separate synthesis.
+
+    Sentences longer than max_chars are split again at word boundaries.
+    Fragments shorter than min_chars ("Yes.", "Dr.") are joined onto the
+    previous chunk, except the first, which is kept short so playback can
+    start as early as possible.
+    """
+    chunks = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if not sentence:
+            continue
+        if len(chunks) > 1 and len(sentence) < min_chars and len(chunks[-1]) + len(sentence) < max_chars:
+            chunks[-1] = f"{chunks[-1]} {sentence}"
+        else:
+            chunks.append(sentence)
+    return chunks
+
+
+def strip_id3(data):
+    """Drop a leading ID3v2 tag, so concatenated MP3 chunks are plain frame sequences"""
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return data[10 + size + footer:]
+    return data
+
+
+def stream_audio(chunks, synthesize_chunk, executor):
+    """Yield the MP3 frames of each chunk in order as soon as that chunk is ready.
+
+    Every chunk is submitted to executor at once; synthesize_chunk(text)
+    returns the path of its MP3. Chunk n is sent as soon as it and every
+    chunk before it have finished. Closing the generator (client gone)
+    cancels the chunks not yet started.
+    """
+    futures = [executor.submit(synthesize_chunk, chunk) for chunk in chunks]
+    try:
+        for future in futures:
+            with open(future.result(), "rb") as f:
+                yield strip_id3(f.read(READ_BLOCK))
+                while True:
+                    block = f.read(READ_BLOCK)
+                    if not block:
+                        break
+                    yield block
+    finally:
+        for future in futures:
+            future.cancel()
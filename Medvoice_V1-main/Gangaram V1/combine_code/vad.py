@@ -0,0 +1,102 @@
+import numpy as np
+
+
+class EnergyVAD:
+    """Splits a stream of 16-bit mono PCM into utterances with an energy-based voice detector.
+
+    Audio is scored in frame_ms frames by RMS energy against a noise floor
+    that adapts during silence. An utterance ends after min_silence_ms of
+    quiet frames, or is cut at max_segment_ms so a long monologue still
+    yields partial results. Segments shorter than min_speech_ms are dropped
+    as clicks and breaths.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=30, threshold=2.5, min_energy=300,
+                 min_silence_ms=600, min_speech_ms=250, max_segment_ms=15000, padding_ms=200):
+        self.sample_rate = sample_rate
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self.threshold = threshold
+        self.min_energy = min_energy
+        self.silence_frames = max(1, min_silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_segment_frames = max(1, max_segment_ms // frame_ms)
+        self.padding_frames = max(0, padding_ms // frame_ms)
+
+        self.noise_floor = None
+        self._pending = b""
+        self._preroll = []
+        self._segment = []
+        self._speech_frames = 0
+        self._quiet_run = 0
+        self.offset_frames = 0
+        self._segment_start = 0
+
+    def is_speech(self, frame):
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        energy = float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        speech = energy > max(self.min_energy, self.noise_floor * self.threshold)
+        if not speech:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+        return speech
+
+    def feed(self, pcm):
+        """Add PCM bytes; returns the (start_seconds, pcm) segments completed by them"""
+        data = self._pending + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+
+        segments = []
+        for start in range(0, usable, self.frame_bytes):
+            segment = self._push(data[start:start + self.frame_bytes])
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self):
+        """End of stream: return the utterance in progress, if any"""
+        if self._segment and self._pending:
+            self._segment.append(self._pending)
+        self._pending = b""
+        segment = self._close() if self._segment else None
+        return [segment] if segment else []
+
+    def _push(self, frame):
+        self.offset_frames += 1
+        speech = self.is_speech(frame)
+
+        if not self._segment:
+            if not speech:
+                self._preroll.append(frame)
+                if len(self._preroll) > self.padding_frames:
+                    self._preroll.pop(0)
+                return None
+            self._segment_start = self.offset_frames - 1 - len(self._preroll)
+            self._segment = self._preroll + [frame]
+            self._preroll = []
+            self._speech_frames = 1
+            self._quiet_run = 0
+            return None
+
+        self._segment.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._quiet_run = 0
+        else:
+            self._quiet_run += 1
+
+        if self._quiet_run >= self.silence_frames or len(self._segment) >= self.max_segment_frames:
+            return self._close()
+        return None
+
+    def _close(self):
+        # Keep only padding_frames of the trailing silence.
+        trailing = max(0, self._quiet_run - self.padding_frames)
+        frames = self._segment[:len(self._segment) - trailing]
+        speech_frames = self._speech_frames
+        start = self._segment_start * self.frame_bytes / 2 / self.sample_rate
+        self._segment, self._speech_frames, self._quiet_run = [], 0, 0
+        if speech_frames < self.min_speech_frames:
+            return None
+        return start, b"".join(frames)
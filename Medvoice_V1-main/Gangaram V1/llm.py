@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext
 import os
+import copy
 import threading
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
@@ -26,6 +27,7 @@ class MedVoiceLLMApp(ctk.CTk):
         self.temperature = tk.DoubleVar(value=0.7)
         self.max_length = tk.IntVar(value=300)
         self.processor = None
+        self.processor_model = None
         self.is_processing = False
         
     
@@ -232,9 +234,10 @@ class MedVoiceLLMApp(ctk.CTk):
         """Process text in a separate thread"""
         try:
      
-            if self.processor is None:
+            if self.processor is None or self.processor_model != self.model_name.get():
                 self.status_var.set(f"Loading model: {self.model_name.get()}")
                 self.processor = ConversationAnalyzer(model_name=self.model_name.get())
+                self.processor_model = self.model_name.get()
             
       
             self.status_var.set("Analyzing conversation...")
@@ -268,6 +271,16 @@ Model: {self.model_name.get()}
         self.output_text.insert("1.0", output_text)
         self.status_var.set("Analysis complete")
 
+PROMPT_PREFIX = """Analyze the following doctor-patient conversation and provide a structured summary:
+
+1. Identify the patient's main concerns or symptoms
+2. Note any diagnoses or assessments made by the doctor
+3. List any recommended treatments or next steps
+4. Highlight important follow-up information
+
+Conversation:
+"""
+
 class ConversationAnalyzer:
     def __init__(self, model_name: str = "gpt2"):
         """
@@ -285,6 +298,25 @@ class ConversationAnalyzer:
 
         if self.tokenizer.pad_token is None:
             self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        self._prefix_cache = None
+        self._prefix_lock = threading.Lock()
+    
+    def get_prefix_cache(self):
+        """
+        Encode the fixed instruction header once and keep its key/value cache.
+        
+        Returns:
+            Tuple of (prefix_ids, past_key_values) for PROMPT_PREFIX
+        """
+        cache_key = (id(self.model), self.device, PROMPT_PREFIX)
+        with self._prefix_lock:
+            if self._prefix_cache is None or self._prefix_cache[0] != cache_key:
+                prefix_ids = self.tokenizer.encode(PROMPT_PREFIX, return_tensors="pt").to(self.device)
+                with torch.no_grad():
+                    past = self.model(prefix_ids, use_cache=True).past_key_values
+                self._prefix_cache = (cache_key, prefix_ids, past)
+            return self._prefix_cache[1], self._prefix_cache[2]
     
     def analyze_conversation(self, conversation_text: str, max_length: int = 200, temperature: float = 0.7) -> str:
         """
@@ -298,23 +330,21 @@ class ConversationAnalyzer:
         Returns:
             Structured summary of the conversation
         """
-        prompt = f"""Analyze the following doctor-patient conversation and provide a structured summary:
-
-1. Identify the patient's main concerns or symptoms
-2. Note any diagnoses or assessments made by the doctor
-3. List any recommended treatments or next steps
-4. Highlight important follow-up information
-
-Conversation:
-{conversation_text.strip()}
+        prompt_tail = f"""{conversation_text.strip()}
 
 Analysis Summary:
 """
-        input_ids = self.tokenizer.encode(prompt, return_tensors="pt").to(self.device)
+        prefix_ids, prefix_past = self.get_prefix_cache()
+        tail_ids = self.tokenizer.encode(prompt_tail, return_tensors="pt").to(self.device)
+        input_ids = torch.cat([prefix_ids, tail_ids], dim=1)
         
         with torch.no_grad():
+            # generate() extends the cache in place, so hand it a copy and
+            # only the conversation part gets prefilled.
             output = self.model.generate(
                 input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=copy.deepcopy(prefix_past),
                 max_length=len(input_ids[0]) + max_length,
                 temperature=temperature,
                 do_sample=True,
@@ -5,6 +5,7 @@ import {
   PlusCircle, Search
 } from 'lucide-react';
 import { motion } from 'framer-motion';
+import useConversationHistory from '../hooks/useConversationHistory';
 
 interface Message {
   id: number;
@@ -22,32 +23,17 @@ interface Patient {
 
 export default function DoctorPatientDashboard() {
   const navigate = useNavigate();
-  const [messages, setMessages] = useState<Message[]>([
-    {
-      id: 1,
-      sender: 'doctor',
-      content: 'Hello Aarohi, how are you feeling today?',
-      time: '9:00 AM'
-    },
-    {
-      id: 2,
-      sender: 'patient',
-      content: 'Hi Doctor, my back pain has been bothering me a lot lately.',
-      time: '9:01 AM'
-    },
-    {
-      id: 3,
-      sender: 'doctor',
-      content: 'I understand. Have you been doing the prescribed exercises?',
-      time: '9:02 AM'
-    },
-    {
-      id: 4,
-      sender: 'patient',
-      content: 'Yes, but I find it difficult to maintain proper posture during work.',
-      time: '9:03 AM'
-    }
-  ]);
+  const { entries } = useConversationHistory();
+  // Entries arrive as "[timestamp] text"; split them for the chat bubbles.
+  const messages: Message[] = entries.map(entry => {
+    const closing = entry.text.indexOf('] ');
+    return {
+      id: entry.id,
+      sender: entry.speaker === 'doctor' ? 'doctor' : 'patient',
+      content: closing === -1 ? entry.text : entry.text.slice(closing + 2),
+      time: closing === -1 ? '' : entry.text.slice(1, closing),
+    };
+  });
   const [recording, setRecording] = useState(false);
 
   const handleStartRecording = () => {
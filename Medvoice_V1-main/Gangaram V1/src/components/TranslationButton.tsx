@@ -2,12 +2,57 @@ import React, { useState, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { ArrowRight, Mic, StopCircle } from 'lucide-react';
+import { consultationHeaders } from '../hooks/useConversationHistory';
 
 interface TranslationButtonProps {
   onLoginClick?: () => void;
   onSignupClick?: () => void;
 }
 
+interface RecordingSegment {
+  index: number;
+  start: number;
+  recognized_text?: string;
+  translated?: string;
+  error?: string;
+}
+
+interface RecordingStream {
+  chunk_url: string;
+  finish_url: string;
+}
+
+// Same-origin paths: the Vite dev server proxies them to Flask, so no CORS preflight is needed.
+const API_BASE = '';
+const PCM_SAMPLE_RATE = 16000;
+const CHUNK_SECONDS = 0.5;
+
+// Web Audio hands out Float32 samples; the server expects 16-bit little-endian PCM.
+const floatTo16BitPCM = (samples: Float32Array): ArrayBuffer => {
+  const view = new DataView(new ArrayBuffer(samples.length * 2));
+  samples.forEach((sample, i) => {
+    const s = Math.max(-1, Math.min(1, sample));
+    view.setInt16(i * 2, s < 0 ? s * 0x8000 : s * 0x7fff, true);
+  });
+  return view.buffer;
+};
+
+// The AudioContext runs at the microphone's own rate (Firefox refuses to mix rates),
+// so average each window of input samples down to the rate the server was told.
+const resample = (samples: Float32Array, fromRate: number, toRate: number): Float32Array => {
+  if (fromRate === toRate) return samples;
+  const step = fromRate / toRate;
+  const output = new Float32Array(Math.floor(samples.length / step));
+  for (let i = 0; i < output.length; i++) {
+    const start = Math.floor(i * step);
+    const end = Math.max(start + 1, Math.floor((i + 1) * step));
+    let sum = 0;
+    for (let j = start; j < end; j++) sum += samples[j];
+    output[i] = sum / (end - start);
+  }
+  return output;
+};
+
 interface DoctorDetails {
   name: string;
   designation: string;
@@ -19,6 +64,7 @@ const TranslationButton: React.FC<TranslationButtonProps> = ({ onLoginClick, onS
   const [isRecording, setIsRecording] = useState(false);
   const [hasRecording, setHasRecording] = useState(false);
   const [audioUrl, setAudioUrl] = useState<string | null>(null);
+  const [segments, setSegments] = useState<RecordingSegment[]>([]);
   const [doctorDetails, setDoctorDetails] = useState<DoctorDetails>({
     name: '',
     designation: '',
@@ -27,10 +73,115 @@ const TranslationButton: React.FC<TranslationButtonProps> = ({ onLoginClick, onS
   
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const audioChunksRef = useRef<Blob[]>([]);
+  const audioContextRef = useRef<AudioContext | null>(null);
+  const processorRef = useRef<ScriptProcessorNode | null>(null);
+  const streamRef = useRef<RecordingStream | null>(null);
+  const pcmBufferRef = useRef<Float32Array[]>([]);
+  const pcmLengthRef = useRef(0);
+  const uploadQueueRef = useRef<Promise<void>>(Promise.resolve());
+  const receivedRef = useRef(0);
+
+  const addSegments = (results: RecordingSegment[]) => {
+    if (results.length === 0) return;
+    receivedRef.current += results.length;
+    setSegments(prev => [...prev, ...results]);
+  };
+
+  // Chunks are chained on one promise so they reach the server in recording order.
+  const sendPcm = () => {
+    const stream = streamRef.current;
+    const audioContext = audioContextRef.current;
+    if (!stream || !audioContext || pcmLengthRef.current === 0) return;
+    const samples = new Float32Array(pcmLengthRef.current);
+    let offset = 0;
+    pcmBufferRef.current.forEach(part => {
+      samples.set(part, offset);
+      offset += part.length;
+    });
+    pcmBufferRef.current = [];
+    pcmLengthRef.current = 0;
+    const body = floatTo16BitPCM(resample(samples, audioContext.sampleRate, PCM_SAMPLE_RATE));
+    uploadQueueRef.current = uploadQueueRef.current.then(async () => {
+      try {
+        const response = await fetch(`${API_BASE}${stream.chunk_url}?after=${receivedRef.current}`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/octet-stream' },
+          body
+        });
+        if (response.ok) {
+          const data = await response.json();
+          addSegments(data.results);
+        }
+      } catch (error) {
+        console.error('Error uploading audio chunk:', error);
+      }
+    });
+  };
+
+  const startPcmStream = async (mediaStream: MediaStream) => {
+    const response = await fetch(`${API_BASE}/save-recording/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...consultationHeaders() },
+      body: JSON.stringify({ sample_rate: PCM_SAMPLE_RATE, doctorDetails })
+    });
+    if (!response.ok) throw new Error(`Could not start recording stream: ${response.status}`);
+    streamRef.current = await response.json();
+    receivedRef.current = 0;
+    pcmBufferRef.current = [];
+    pcmLengthRef.current = 0;
+    setSegments([]);
+
+    const audioContext = new AudioContext();
+    audioContextRef.current = audioContext;
+    const source = audioContext.createMediaStreamSource(mediaStream);
+    const processor = audioContext.createScriptProcessor(4096, 1, 1);
+    processor.onaudioprocess = (event) => {
+      const input = event.inputBuffer.getChannelData(0);
+      pcmBufferRef.current.push(new Float32Array(input));
+      pcmLengthRef.current += input.length;
+      if (pcmLengthRef.current >= audioContext.sampleRate * CHUNK_SECONDS) {
+        sendPcm();
+      }
+    };
+    source.connect(processor);
+    processor.connect(audioContext.destination);
+    processorRef.current = processor;
+  };
+
+  const stopPcmCapture = async () => {
+    processorRef.current?.disconnect();
+    processorRef.current = null;
+    sendPcm();
+    await audioContextRef.current?.close();
+    audioContextRef.current = null;
+  };
+
+  const finishPcmStream = async () => {
+    await stopPcmCapture();
+    const stream = streamRef.current;
+    if (!stream) return;
+    await uploadQueueRef.current;
+    const response = await fetch(`${API_BASE}${stream.finish_url}`, { method: 'POST' });
+    if (response.ok) {
+      const data = await response.json();
+      addSegments(data.segments.slice(receivedRef.current));
+    }
+    streamRef.current = null;
+  };
+
+  // The whole recording in one request, for when the chunked stream could not be started.
+  const uploadRecording = (audioBlob: Blob) => {
+    const formData = new FormData();
+    formData.append('audio', new File([audioBlob], 'doctor_recording.wav', { type: 'audio/wav' }));
+    formData.append('doctorDetails', JSON.stringify(doctorDetails));
+    fetch(`${API_BASE}/save-recording`, { method: 'POST', headers: consultationHeaders(), body: formData })
+      .catch(error => console.error('Error uploading recording:', error));
+  };
 
   const handleStartRecording = async () => {
+    let stream: MediaStream | null = null;
     try {
-      const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+      stream = await navigator.mediaDevices.getUserMedia({ audio: true });
       const mediaRecorder = new MediaRecorder(stream);
       mediaRecorderRef.current = mediaRecorder;
       audioChunksRef.current = [];
@@ -42,21 +193,27 @@ const TranslationButton: React.FC<TranslationButtonProps> = ({ onLoginClick, onS
         }
       };
 
+      let streaming = true;
+      try {
+        await startPcmStream(stream);
+      } catch (error) {
+        console.error('Recording stream unavailable, uploading when recording stops:', error);
+        streaming = false;
+        streamRef.current = null;
+        await stopPcmCapture().catch(() => undefined);
+      }
+
       mediaRecorder.onstop = () => {
         const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/wav' });
-        const audioFile = new File([audioBlob], 'doctor_recording.wav', { type: 'audio/wav' });
         const url = URL.createObjectURL(audioBlob);
         setAudioUrl(url);
-        
-        // Save the audio file
-        const formData = new FormData();
-        formData.append('audio', audioFile);
-        formData.append('doctorDetails', JSON.stringify(doctorDetails));
-        
-        fetch('http://localhost:5000/save-recording', {
-          method: 'POST',
-          body: formData
-        });
+
+        if (streaming) {
+          // The audio was already streamed to the server while recording.
+          finishPcmStream().catch(error => console.error('Error finishing recording stream:', error));
+        } else {
+          uploadRecording(audioBlob);
+        }
 
         setHasRecording(true);
       };
@@ -65,6 +222,8 @@ const TranslationButton: React.FC<TranslationButtonProps> = ({ onLoginClick, onS
       setIsRecording(true);
     } catch (error) {
       console.error('Error accessing microphone:', error);
+      // Release the microphone, or the browser keeps showing it as in use.
+      stream?.getTracks().forEach(track => track.stop());
     }
   };
 
@@ -108,6 +267,17 @@ const TranslationButton: React.FC<TranslationButtonProps> = ({ onLoginClick, onS
         </p>
       </div>
 
+      {segments.length > 0 && (
+        <div className="w-full mb-6 p-4 bg-dark-500 rounded-lg border border-gray-600 space-y-2">
+          {segments.map(segment => (
+            <p key={segment.index} className="text-white">
+              {segment.error ? `Error: ${segment.error}` : segment.recognized_text}
+              {segment.translated && <span className="block text-gray-400">{segment.translated}</span>}
+            </p>
+          ))}
+        </div>
+      )}
+
       {audioUrl && (
         <div className="w-full mb-6">
           <audio controls src={audioUrl} className="w-full">
@@ -0,0 +1,72 @@
+import { useCallback, useEffect, useRef, useState } from 'react';
+
+// Same-origin paths: the Vite dev server proxies them to Flask, so the X-Consultation-Id header needs no CORS preflight.
+const API_BASE = '';
+const POLL_MS = 3000;
+const CONSULTATION_KEY = 'consultationId';
+
+export interface HistoryEntry {
+  id: number;
+  speaker: 'doctor' | 'patient' | 'unknown';
+  text: string;
+}
+
+interface HistoryDelta {
+  entries: HistoryEntry[];
+  cursor: string;
+  reset: boolean;
+  more: boolean;
+}
+
+// The backend keeps one history per consultation; this tab's id travels in a header.
+export const consultationId = (): string => {
+  let id = sessionStorage.getItem(CONSULTATION_KEY);
+  if (!id) {
+    id = crypto.randomUUID().replace(/-/g, '');
+    sessionStorage.setItem(CONSULTATION_KEY, id);
+  }
+  return id;
+};
+
+export const consultationHeaders = (): Record<string, string> => ({ 'X-Consultation-Id': consultationId() });
+
+// Polls /translator/history for the entries after the last cursor, so each turn
+// costs the size of that turn and an idle consultation costs an empty 304.
+export default function useConversationHistory(pollMs: number = POLL_MS) {
+  const [entries, setEntries] = useState<HistoryEntry[]>([]);
+  const cursorRef = useRef('');
+  const syncingRef = useRef(false);
+
+  const sync = useCallback(async () => {
+    if (syncingRef.current) return;
+    syncingRef.current = true;
+    try {
+      let more = true;
+      while (more) {
+        const headers: Record<string, string> = { Accept: 'application/json', ...consultationHeaders() };
+        if (cursorRef.current) headers['If-None-Match'] = `"${cursorRef.current}"`;
+        const response = await fetch(
+          `${API_BASE}/translator/history?after=${encodeURIComponent(cursorRef.current)}`, { headers });
+        if (response.status === 304 || !response.ok) return;
+        const delta: HistoryDelta = await response.json();
+        setEntries(previous => (delta.reset ? delta.entries : [...previous, ...delta.entries]));
+        cursorRef.current = delta.cursor;
+        more = delta.more;
+      }
+    } catch (error) {
+      console.error('Error syncing conversation history:', error);
+    } finally {
+      syncingRef.current = false;
+    }
+  }, []);
+
+  useEffect(() => {
+    sync();
+    const timer = setInterval(() => {
+      if (document.visibilityState === 'visible') sync();
+    }, pollMs);
+    return () => clearInterval(timer);
+  }, [sync, pollMs]);
+
+  return { entries, refresh: sync };
+}
@@ -27,8 +27,14 @@ def get_language_code(language_name):
     return language_mapping.get(language_name.lower(), language_name)
 
 # Translation logic
+# Cached per (normalized text, target language) across reruns, so repeated
+# clinic phrases skip the googletrans round trip.
+@st.cache_data(max_entries=5000, ttl=7 * 24 * 3600, show_spinner=False)
+def cached_translation(normalized_text, to_language):
+    return translator.translate(normalized_text, src='auto', dest=to_language).text
+
 def translator_function(spoken_text, to_language):
-    return translator.translate(spoken_text, src='auto', dest=to_language)
+    return cached_translation(" ".join(spoken_text.split()), to_language)
 
 # Text-to-speech
 def text_to_voice(text_data, to_language):
@@ -67,8 +73,7 @@ def main_process(output_placeholder, doctor_language, patient_language):
             to_language = doctor_language
 
         output_placeholder.text("Translating...")
-        translated = translator_function(spoken_text, to_language)
-        output_text = translated.text
+        output_text = translator_function(spoken_text, to_language)
 
         output_placeholder.text(f"Translated: {output_text}")
         text_to_voice(output_text, to_language)
@@ -11,7 +11,9 @@ export default defineConfig({
   server: {
     proxy: {
       '/welcome.mp3': 'http://localhost:5000',
-      '/test-sound.mp3': 'http://localhost:5000'
+      '/test-sound.mp3': 'http://localhost:5000',
+      '/save-recording': 'http://localhost:5000',
+      '/translator/history': 'http://localhost:5000'
     }
   }
 });
\ No newline at end of file